@@ -6,10 +6,7 @@
 #
 #    or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the specific language governing permissions and limitations under the License.
 
-import concurrent.futures
-import copy
 import six
-import time
 
 if six.PY2:
     import rdk
@@ -24,11 +21,17 @@ def main():
     my_rdk = rdk.rdk(args)
 
     if args.region_file:
-        if args.command in ['init', 'deploy', 'undeploy']:
+        if args.command in rdk.MULTI_REGION_COMMANDS:
+            #Output from each region is only printed once that region finishes, so following logs would never print anything.
+            if args.command == 'logs' and rdk.get_logs_parser().parse_known_args(args.command_args)[0].follow:
+                my_parser.error("The --follow argument of logs cannot be used with the --region-file argument.")
+
             regions = rdk.parse_region_file(args)
-            print(f"{args.command.capitalize()}ing rules in the following regions: {regions}.")
-            if args.command == 'undeploy' and "--force" not in args.command_args:
-                my_input = input("Delete specified Rules and Lambda Functions from your AWS Account? (y/N): ")
+            print(f"Running {args.command} in the following regions: {regions}.")
+
+            #Destructive commands prompt once up front, instead of once per region.
+            if args.command in rdk.MULTI_REGION_CONFIRMATIONS and "--force" not in args.command_args:
+                my_input = input(rdk.MULTI_REGION_CONFIRMATIONS[args.command])
                 while my_input.lower() not in ["y", "n"]:
                     my_input = input(f"Invalid input: {my_input}. Please enter either 'y' or 'n': ")
                 if my_input.lower() == "y":
@@ -36,19 +39,13 @@ def main():
                 elif my_input.lower() == "n" or my_input == "":
                     exit(0)
 
-            args_list = []
-            for region in regions:
-                vars(args)['region'] = region
-                args_list.append(copy.copy(args))
-
-            data = []
-            with concurrent.futures.ProcessPoolExecutor(max_workers=16) as executor:
-                future_run_multi_region = {executor.submit(rdk.run_multi_region, args): args for args in args_list}
-                for future in concurrent.futures.as_completed(future_run_multi_region):
-                    data.append(future.result())
-            exit(0)
+            #Build each Rule package once, rather than once per region.
+            if args.command in ['deploy', 'deploy-organization', 'export']:
+                rdk.build_rule_packages(args)
+
+            exit(rdk.run_region_commands(args, regions))
         else:
-            my_parser.error("Command must be 'init', 'deploy', or 'undeploy' when --region-file argument is provided.")
+            my_parser.error(f"Command must be one of {', '.join(rdk.MULTI_REGION_COMMANDS)} when --region-file argument is provided.")
 
     return_val = my_rdk.process_command()
     exit(return_val)
@@ -7,25 +7,57 @@
 #    or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the specific language governing permissions and limitations under the License.
 import argparse
 import base64
+import concurrent.futures
+import contextlib
+import contextvars
+import copy
 import fileinput
 import fnmatch
+import hashlib
+import importlib
+import io
 import json
+import math
 import os
 import shutil
 import subprocess
 import sys
 import tempfile
+import threading
 import time
-import unittest
-from boto3 import session
-import yaml
 from builtins import input
 from datetime import datetime
 from os import path
 import uuid
-import boto3
-import botocore
-from botocore.exceptions import ClientError, EndpointConnectionError
+import zipfile
+
+class LazyModule:
+    """
+        Imports a module on first use, so that commands which never talk to AWS do not pay for importing boto3 and friends.
+    """
+    def __init__(self, name):
+        self.name = name
+
+    def __getattr__(self, attr):
+        module = importlib.import_module(self.name)
+        try:
+            return getattr(module, attr)
+        except AttributeError:
+            pass
+
+        #Submodules (e.g. botocore.exceptions) are not always imported by their package.
+        try:
+            return importlib.import_module(self.name + "." + attr)
+        except ImportError:
+            raise AttributeError(f"module '{self.name}' has no attribute '{attr}'")
+
+boto3 = LazyModule('boto3')
+botocore = LazyModule('botocore')
+gzip = LazyModule('gzip')
+multiprocessing = LazyModule('multiprocessing')
+unittest = LazyModule('unittest')
+yaml = LazyModule('yaml')
+ElementTree = LazyModule('xml.etree.ElementTree')
 
 #sphinx-argparse is a delight.
 try:
@@ -35,6 +67,30 @@ except ImportError:
     pass
 
 rdk_dir = '.rdk'
+package_manifest_filename = 'package-manifest.json'
+workspace_index_filename = 'workspace-index.json'
+test_local_cache_filename = 'test-local-cache.json'
+package_manifest_lock = threading.Lock()
+package_exclude_dirs = ['__pycache__']
+#Files that rdk itself writes into Rule directories (packages, and the Terraform files from export) are never part of the Rule's sources.
+rdk_output_patterns = ['*.zip', '*.zip.*', '*.tfvars.json', '*.tf']
+package_exclude_patterns = rdk_output_patterns + ['*.pyc', '*_test.py', '*_test.js', '*_benchmark.py']
+build_output_dirs = ['build', '.gradle', 'bin', 'obj']
+package_cache_dir = os.path.join(rdk_dir, 'packages')
+package_tmp_dir = os.path.join(rdk_dir, 'tmp')
+benchmark_history_dir = os.path.join(rdk_dir, 'benchmarks')
+benchmark_history_limit = 100
+lambda_report_fields = {
+    'Duration': 'DurationMs',
+    'Billed Duration': 'BilledDurationMs',
+    'Memory Size': 'MemorySizeMB',
+    'Max Memory Used': 'MaxMemoryUsedMB',
+    'Init Duration': 'InitDurationMs'
+}
+api_semaphores = {}
+api_semaphores_lock = threading.Lock()
+session_pool = {}
+session_pool_lock = threading.Lock()
 rules_dir = ''
 tests_dir = ''
 util_filename = 'rule_util'
@@ -56,6 +112,20 @@ RDKLIB_LAYER_SAR_ID = "arn:aws:serverlessrepo:ap-southeast-1:711761543063:applic
 
 RDKLIB_ARN_STRING = "arn:aws:lambda:{region}:711761543063:layer:rdklib-layer:{version}"
 PARALLEL_COMMAND_THROTTLE_PERIOD = 2  # 2 seconds, used in running commands in parallel over multiple regions
+MULTI_REGION_COMMANDS = ['init', 'deploy', 'undeploy', 'deploy-organization', 'undeploy-organization', 'logs', 'test-remote', 'export', 'clean']
+MULTI_REGION_CONFIRMATIONS = {
+    'undeploy': "Delete specified Rules and Lambda Functions from your AWS Account? (y/N): ",
+    'undeploy-organization': "Delete specified Rules and Lambda Functions from your Organization? (y/N): ",
+    'clean': "Delete all Rules and remove Config setup?! (y/N): "
+}
+MULTI_REGION_MAX_WORKERS = 16  # regions processed at the same time when using --region-file
+MULTI_REGION_API_CONCURRENCY = 8  # concurrent calls per AWS service across all regions when using --region-file
+CLIENT_MAX_POOL_CONNECTIONS = 50  # HTTP connections per pooled client, enough for parallel deploys and S3 transfers
+CFN_WAIT_MIN_DELAY = 2  # seconds between CloudFormation polls while stack events are arriving
+CFN_WAIT_MAX_DELAY = 30  # upper bound for the CloudFormation polling backoff while stacks are idle
+LOGS_STATS_MAX_WORKERS = 8  # log groups scanned at the same time by logs --stats
+LAMBDA_MEMORY_HEADROOM = 1.3  # suggested memory is the most ever used plus this much headroom
+LAMBDA_TIMEOUT_HEADROOM = 2  # suggested timeout is the longest duration seen times this
 
 #this need to be update whenever config service supports more resource types : https://docs.aws.amazon.com/config/latest/developerguide/resource-config-reference.html
 accepted_resource_types = [
@@ -226,11 +296,11 @@ def get_command_parser():
     parser.add_argument('-k','--access-key-id', help="[optional] Access Key ID to use.")
     parser.add_argument('-s','--secret-access-key', help="[optional] Secret Access Key to use.")
     parser.add_argument('-r','--region', help='Select the region to run the command in.')
-    parser.add_argument('-f', '--region-file',help="[optional] File to specify which regions to run the command in parallel. Supported for init, deploy, and undeploy.")
+    parser.add_argument('-f', '--region-file',help="[optional] File to specify which regions to run the command in parallel. Supported for init, deploy, undeploy, deploy-organization, undeploy-organization, logs, test-remote, export and clean.")
     parser.add_argument('--region-set', help="[optional] Set of regions within the region file with which to run the command in parallel. Looks for a 'default' region set if not specified.")
     #parser.add_argument('--verbose','-v', action='count')
-    #Removed for now from command choices: 'test-remote', 'status'
-    parser.add_argument('command', metavar='<command>', help='Command to run.  Refer to the usage instructions for each command for more details', choices=['clean', 'create', 'create-rule-template', 'deploy', 'deploy-organization', 'init', 'logs', 'modify', 'rulesets', 'sample-ci', 'test-local', 'undeploy', 'undeploy-organization', 'export', 'create-region-set'])
+    #Removed for now from command choices: 'status'
+    parser.add_argument('command', metavar='<command>', help='Command to run.  Refer to the usage instructions for each command for more details', choices=['clean', 'create', 'create-rule-template', 'deploy', 'deploy-organization', 'init', 'logs', 'modify', 'rulesets', 'sample-ci', 'test-local', 'test-remote', 'replay', 'benchmark', 'undeploy', 'undeploy-organization', 'export', 'create-region-set'])
     parser.add_argument('command_args', metavar='<command arguments>', nargs=argparse.REMAINDER, help="Run `rdk <command> --help` to see command-specific arguments.")
     parser.add_argument('-v','--version', help='Display the version of this tool', action="version", version='%(prog)s '+MY_VERSION)
 
@@ -337,6 +407,9 @@ def get_deployment_parser(ForceArgument=False, Command="deploy"):
 
     if ForceArgument:
         parser.add_argument("--force", required=False, action='store_true', help='[optional] Remove selected Rules from account without prompting for confirmation.')
+    else:
+        parser.add_argument('--parallel', required=False, default=1, type=int, metavar='N', help='[optional] Number of Rules to package, upload and deploy concurrently. Stack operations are waited on together and a per-Rule summary is printed at the end. Defaults to 1 (sequential).')
+        parser.add_argument('--force-upload', required=False, action='store_true', help='[optional] Package, upload and publish the Lambda code even if it has not changed since the last deployment.')
     return parser
 
 def get_deployment_organization_parser(ForceArgument=False, Command="deploy-organization"):
@@ -365,6 +438,8 @@ def get_deployment_organization_parser(ForceArgument=False, Command="deploy-orga
 
     if ForceArgument:
         parser.add_argument("--force", required=False, action='store_true', help='[optional] Remove selected Rules from account without prompting for confirmation.')
+    else:
+        parser.add_argument('--force-upload', required=False, action='store_true', help='[optional] Package, upload and publish the Lambda code even if it has not changed since the last deployment.')
     return parser
 
 def get_export_parser(ForceArgument=False, Command="export"):
@@ -404,11 +479,34 @@ def get_test_parser(command):
     parser.add_argument('--test-ci-types', '-t', help="[optional] CI type to use for testing.")
     parser.add_argument('--verbose', '-v', action='store_true', help='[optional] Enable full log output')
     parser.add_argument('-s','--rulesets', required=False, help='[optional] comma-delimited list of RuleSet names')
+    if command == "test-local":
+        parser.add_argument('--workers', required=False, type=int, metavar='N', help='[optional] Number of worker processes to run Rule test suites in.  Defaults to the number of CPUs.')
+        parser.add_argument('--junit-xml', required=False, metavar='<file>', help='[optional] Write the merged test results to this file in JUnit XML format.')
+        parser.add_argument('--force', required=False, action='store_true', help='[optional] Run the tests of every Rule, even if neither the Rule nor its tests have changed since they last passed.')
+        parser.add_argument('--phase-profile', dest='phase_profile', required=False, action='store_true', help='[optional] Time each phase of the Rule handlers while the tests run, and print a profile for each Rule.  Implies --force.')
+    if command == "test-remote":
+        parser.add_argument('--test-parameters', required=False, help='[optional] JSON of rule parameters to send with every test event.')
+        parser.add_argument('--concurrency', required=False, default=8, type=int, metavar='N', help='[optional] Number of Lambda invocations to run at the same time. Defaults to 8.')
+        parser.add_argument('--report', required=False, metavar='<file>', help='[optional] Write a JSON report with the result, latency and billed duration of every invocation to this file.')
     return parser
 
 def get_test_local_parser():
     return get_test_parser("test-local")
 
+def get_test_remote_parser():
+    return get_test_parser("test-remote")
+
+def parse_lambda_report(log_text):
+    #Lambda ends every invocation log with a line like "REPORT RequestId: ... Duration: 1.23 ms Billed Duration: 2 ms Memory Size: 128 MB Max Memory Used: 70 MB Init Duration: 150.00 ms"
+    report = {}
+    for line in log_text.splitlines():
+        if line.startswith('REPORT '):
+            for field in line.split('\t'):
+                name, _, value = field.partition(':')
+                if name.strip() in lambda_report_fields:
+                    report[lambda_report_fields[name.strip()]] = float(value.strip().split(' ')[0])
+    return report
+
 def get_sample_ci_parser():
     parser = argparse.ArgumentParser(
         prog='rdk sample-ci',
@@ -420,12 +518,16 @@ def get_sample_ci_parser():
 def get_logs_parser():
     parser = argparse.ArgumentParser(
         prog='rdk logs',
-        usage="rdk logs <rulename> [-n/--number NUMBER] [-f/--follow]",
+        usage="rdk logs <rulename> [-n/--number NUMBER] [-f/--follow] | rdk logs --stats [<rulename> ...] [-a/--all] [-s/--rulesets RULESETS] [--hours HOURS]",
         description="Displays CloudWatch logs for the Lambda Function for the specified Rule."
     )
-    parser.add_argument('rulename', metavar='<rulename>', help='Rule whose logs will be displayed')
+    parser.add_argument('rulename', metavar='<rulename>', nargs='*', help='Rule whose logs will be displayed.  Several Rules may be given with --stats.')
     parser.add_argument('-f','--follow',  action='store_true', help='[optional] Continuously poll Lambda logs and write to stdout.')
     parser.add_argument('-n','--number',  default=3, help='[optional] Number of previous logged events to display.')
+    parser.add_argument('--stats', action='store_true', help='[optional] Instead of displaying logs, summarize the duration, cold starts and memory use of the Lambda Function from its REPORT lines, and suggest memory and timeout settings.')
+    parser.add_argument('--hours', type=int, default=24, help='[optional] Number of hours of logs to summarize with --stats.  Defaults to 24.')
+    parser.add_argument('--all','-a', action='store_true', help="[optional] With --stats, summarize every Rule in the working directory.")
+    parser.add_argument('-s','--rulesets', required=False, help='[optional] With --stats, comma-delimited list of RuleSet names to summarize.')
     return parser
 
 def get_rulesets_parser():
@@ -461,6 +563,31 @@ def get_create_region_set_parser():
     parser.add_argument('-o','--output-file', required=False, default="regions", help="Filename of the generated region set file")
     return parser
 
+def get_replay_parser():
+    parser = argparse.ArgumentParser(
+        prog='rdk replay',
+        description="Replays a file of configuration items through a Rule's Lambda handler locally, and reports how quickly it evaluates them."
+    )
+    parser.add_argument('rulename', metavar='<rulename>', help='Rule to replay the configuration items through.')
+    parser.add_argument('--input', '-i', required=True, metavar='<file>', help='JSON Lines file with one configuration item per line, or a Config snapshot file.  Files ending in .gz are decompressed.')
+    parser.add_argument('--rule-parameters', required=False, help='[optional] JSON of rule parameters to evaluate with.  Defaults to the InputParameters of the Rule.')
+    parser.add_argument('--limit', '-n', required=False, type=int, help='[optional] Only replay the first N configuration items.')
+    parser.add_argument('--lambda-timeout', required=False, default=60, type=int, help='[optional] Timeout (in seconds) of the Lambda function, used to warn about slow evaluations.  Defaults to 60.')
+    parser.add_argument('--report', required=False, metavar='<file>', help='[optional] Write the replay statistics to this file as JSON.')
+    parser.add_argument('--verbose', '-v', action='store_true', help='[optional] Show the output of the Rule handler.')
+    return parser
+
+def get_benchmark_parser():
+    parser = argparse.ArgumentParser(
+        prog='rdk benchmark',
+        description="Times a Rule's Lambda handler against the events in its benchmark module, and compares the results with the previous run."
+    )
+    parser.add_argument('rulename', metavar='<rulename>', help='Rule to benchmark.')
+    parser.add_argument('--iterations', '-n', required=False, type=int, help='[optional] Number of times to evaluate each event.  Defaults to ITERATIONS in the benchmark module.')
+    parser.add_argument('--threshold', required=False, type=float, default=20, help='[optional] Percentage by which the median time of an event may grow over the previous run before it is flagged as a regression.  Defaults to 20.')
+    parser.add_argument('--no-history', action='store_true', help='[optional] Do not record this run in the benchmark history.')
+    return parser
+
 def parse_region_file(args):
     region_set = "default"
     if args.region_set:
@@ -471,15 +598,577 @@ def parse_region_file(args):
     except Exception:
         raise SyntaxError(f"Error reading regions: {region_set} in file: {args.region_file}")
 
+def run_rule_tests(task):
+    """
+        Runs the unit tests of a single Rule.  This is called in a fresh worker process for every Rule, so each Rule's modules and boto3 mocks never leak into another Rule's tests.
+    """
+    rule_name, test_dir, verbose, profile = task
+    if profile:
+        #Rules created from the RDK templates time each phase of their handler when RDK_METRICS is set.
+        os.environ['RDK_METRICS'] = '1'
+    result = {'RuleName': rule_name, 'Tests': 0, 'Failures': 0, 'Errors': 0, 'Skipped': 0, 'TestCases': []}
+    test_cases = result['TestCases']
+
+    class RuleTestResult(unittest.TextTestResult):
+        def startTest(self, test):
+            self.test_start_time = time.time()
+            super().startTest(test)
+
+        def __add_test_case(self, test, status, message=None, details=None):
+            test_cases.append({'Name': test.id(), 'Status': status, 'Duration': time.time() - getattr(self, 'test_start_time', time.time()), 'Message': message, 'Details': details})
+
+        def addSuccess(self, test):
+            super().addSuccess(test)
+            self.__add_test_case(test, 'PASS')
+
+        def addFailure(self, test, err):
+            super().addFailure(test, err)
+            self.__add_test_case(test, 'FAIL', f"{err[0].__name__}: {err[1]}".splitlines()[0], self.failures[-1][1])
+
+        def addError(self, test, err):
+            super().addError(test, err)
+            self.__add_test_case(test, 'ERROR', f"{err[0].__name__}: {err[1]}".splitlines()[0], self.errors[-1][1])
+
+        def addSkip(self, test, reason):
+            super().addSkip(test, reason)
+            self.__add_test_case(test, 'SKIP', reason)
+
+    #The generated Rule tests only "import botocore" but use botocore.exceptions, which boto3 used to import for them when rdk loaded it eagerly.
+    import botocore.exceptions
+
+    output = io.StringIO()
+    start_time = time.time()
+    try:
+        tests = []
+        for (top, dirs, filenames) in os.walk(test_dir):
+            for filename in fnmatch.filter(filenames, '*_test.py'):
+                sys.path.insert(0, top)
+                tests.append(filename[:-3])
+
+        suite = unittest.TestSuite([unittest.defaultTestLoader.loadTestsFromName(test) for test in tests])
+        results = unittest.TextTestRunner(stream=output, buffer=not verbose, verbosity=2, resultclass=RuleTestResult).run(suite)
+        result.update({'Tests': results.testsRun, 'Failures': len(results.failures) + len(results.unexpectedSuccesses), 'Errors': len(results.errors), 'Skipped': len(results.skipped)})
+    except Exception as e:
+        #A Rule whose tests cannot even be loaded should not stop the other Rules from being tested.
+        output.write(f"Unable to run tests for {rule_name}: {e}\n")
+        result['Errors'] += 1
+        test_cases.append({'Name': rule_name, 'Status': 'ERROR', 'Duration': 0, 'Message': str(e), 'Details': str(e)})
+
+    result['Duration'] = time.time() - start_time
+    result['Output'] = output.getvalue()
+    if profile:
+        result['Profile'] = {}
+        for module in list(sys.modules.values()):
+            if (getattr(module, '__file__', None) or '').startswith(test_dir + os.sep) and isinstance(getattr(module, 'PHASE_PROFILE', None), dict):
+                result['Profile'].update(module.PHASE_PROFILE)
+    return result
+
+def write_junit_xml(results, junit_file):
+    #One <testsuite> per Rule, so CI systems can group the results the same way the summary does.
+    testsuites = ElementTree.Element('testsuites', {
+        'tests': str(sum(result['Tests'] for result in results)),
+        'failures': str(sum(result['Failures'] for result in results)),
+        'errors': str(sum(result['Errors'] for result in results)),
+        'time': f"{sum(result['Duration'] for result in results):.3f}"
+    })
+    for result in results:
+        testsuite = ElementTree.SubElement(testsuites, 'testsuite', {
+            'name': result['RuleName'],
+            'tests': str(result['Tests']),
+            'failures': str(result['Failures']),
+            'errors': str(result['Errors']),
+            'skipped': str(result['Skipped']),
+            'time': f"{result['Duration']:.3f}"
+        })
+        for test_case in result['TestCases']:
+            class_name, _, test_name = test_case['Name'].rpartition('.')
+            testcase = ElementTree.SubElement(testsuite, 'testcase', {'classname': class_name or result['RuleName'], 'name': test_name, 'time': f"{test_case['Duration']:.3f}"})
+            if test_case['Status'] == 'FAIL':
+                ElementTree.SubElement(testcase, 'failure', {'message': test_case['Message']}).text = test_case['Details']
+            elif test_case['Status'] == 'ERROR':
+                ElementTree.SubElement(testcase, 'error', {'message': test_case['Message']}).text = test_case['Details']
+            elif test_case['Status'] == 'SKIP':
+                ElementTree.SubElement(testcase, 'skipped', {'message': test_case['Message']})
+
+    ElementTree.ElementTree(testsuites).write(junit_file, encoding='utf-8', xml_declaration=True)
+
+def percentile(sorted_values, percent):
+    #Nearest-rank percentile of an already sorted list.
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, math.ceil(percent / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def read_configuration_items(input_file):
+    """
+        Yields configuration items from a JSON Lines file, or from a Config snapshot file.  JSON Lines files are read one line at a time, so large corpora never have to fit in memory.
+    """
+    opener = gzip.open if input_file.endswith('.gz') else open
+    with opener(input_file, 'rt') as f:
+        items_read = 0
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError as e:
+                if items_read:
+                    raise ValueError(f"{input_file}: line {line_number} is not valid JSON: {e}")
+
+                #Not JSON Lines, so it must be a single (pretty-printed) JSON document.
+                f.seek(0)
+                try:
+                    document = json.load(f)
+                except ValueError as e:
+                    raise ValueError(f"{input_file}: not a JSON Lines file or a JSON document: {e}")
+                yield from (document['configurationItems'] if isinstance(document, dict) else document)
+                return
+
+            #Snapshot files delivered by Config are a single line holding every configuration item.
+            items_read += 1
+            if isinstance(item, dict) and 'configurationItems' in item:
+                yield from item['configurationItems']
+            else:
+                yield item
+
+@contextlib.contextmanager
+def rule_import_path(rule_dir):
+    """
+        Lets a Rule's modules be imported in-process, and forgets them again afterwards along with any boto3 stand-in they installed.
+    """
+    real_boto3 = sys.modules.get('boto3')
+    sys.path.insert(0, rule_dir)
+    try:
+        yield
+    finally:
+        sys.path.remove(rule_dir)
+        for name, module in list(sys.modules.items()):
+            if (getattr(module, '__file__', None) or '').startswith(rule_dir + os.sep):
+                del sys.modules[name]
+        if real_boto3:
+            sys.modules['boto3'] = real_boto3
+        else:
+            sys.modules.pop('boto3', None)
+
+class ReplayConfigClient:
+    """
+        Stands in for the Config client while replaying, recording evaluations instead of sending them.
+    """
+    def __init__(self):
+        self.evaluations = []
+
+    def put_evaluations(self, Evaluations, ResultToken, TestMode=False):
+        self.evaluations.extend(Evaluations)
+        return {'FailedEvaluations': []}
+
+    def __getattr__(self, name):
+        #Any other Config API is answered by a mock, so Rules that look up resources still run.
+        setattr(self, name, unittest.mock.MagicMock())
+        return getattr(self, name)
+
+class ReplayBoto3:
+    """
+        Stands in for the boto3 module while replaying, so that no Rule ever calls AWS.
+    """
+    def __init__(self, config_client):
+        self.config_client = config_client
+        self.clients = {}
+
+    def client(self, service_name, *args, **kwargs):
+        if service_name == 'config':
+            return self.config_client
+        return self.clients.setdefault(service_name, unittest.mock.MagicMock())
+
+class ReplayContext:
+    def __init__(self, timeout):
+        self.function_name = 'rdk-replay'
+        self.aws_request_id = 'rdk-replay'
+        self.deadline = time.time() + timeout
+
+    def get_remaining_time_in_millis(self):
+        return int(max(0, self.deadline - time.time()) * 1000)
+
+def build_rule_packages(args):
+    #Build every Rule package once up front, so that the per-region processes all reuse the same artifacts.
+    #The source hashes are handed to every region too, so that the Rule directories are only hashed once.
+    my_rdk = rdk(copy.copy(args))
+    vars(args)['source_hashes'] = my_rdk.build_packages()
+
 def run_multi_region(args):
     my_rdk = rdk(args)
     return_val = my_rdk.process_command()
     return return_val
 
+def run_region_commands(args, regions):
+    #Resolve credentials and the caller identity once, and share them with every region.
+    session_args = {'region_name': regions[0]}
+    if args.profile:
+        session_args['profile_name'] = args.profile
+    elif args.access_key_id and args.secret_access_key:
+        session_args['aws_access_key_id'] = args.access_key_id
+        session_args['aws_secret_access_key'] = args.secret_access_key
+
+    my_session = boto3.session.Session(**session_args)
+    credentials = my_session.get_credentials()
+    if credentials is None:
+        print("Unable to locate AWS credentials.")
+        return 1
+
+    #Share the credentials object itself, so that temporary credentials are refreshed for every region as they expire.
+    vars(args)['shared_credentials'] = credentials
+    try:
+        vars(args)['caller_identity'] = my_session.client('sts').get_caller_identity()
+    except botocore.exceptions.ClientError as e:
+        print(f"Unable to determine the caller identity: {e}")
+        return 1
+
+    results = {}
+    region_output = RegionOutput(sys.stdout)
+    sys.stdout = region_output
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=MULTI_REGION_MAX_WORKERS) as executor:
+            future_run_region_command = {}
+            for region in regions:
+                region_args = copy.copy(args)
+                vars(region_args)['region'] = region
+                future_run_region_command[executor.submit(run_region_command, region_args, region_output)] = region
+            for future in concurrent.futures.as_completed(future_run_region_command):
+                results[future_run_region_command[future]] = future.result()
+    finally:
+        sys.stdout = region_output.stream
+
+    print(f"{'Region':<20} {'Result':<10} Duration")
+    for region in regions:
+        result = results[region]
+        status = "OK" if result['ExitCode'] == 0 else f"FAILED ({result['ExitCode']})"
+        print(f"{region:<20} {status:<10} {result['Duration']:.1f}s")
+
+    if any(result['ExitCode'] != 0 for result in results.values()):
+        return 1
+    return 0
+
+def run_region_command(args, region_output):
+    #Commands report failures through return values, sys.exit() or exceptions, so normalize all of them to an exit code.
+    start_time = time.time()
+    with region_output.buffered():
+        try:
+            exit_code = run_multi_region(args)
+        except SystemExit as e:
+            exit_code = e.code
+        except Exception as e:
+            print(f"[{args.region}]: Error: {e}")
+            exit_code = 1
+
+        if exit_code is None:
+            exit_code = 0
+        elif not isinstance(exit_code, int):
+            print(f"[{args.region}]: {exit_code}")
+            exit_code = 1
+
+    return {'ExitCode': exit_code, 'Duration': time.time() - start_time}
+
+def submit_in_context(executor, fn, *args):
+    #Worker threads start with an empty context, so hand them a copy of the caller's, including where its output is buffered.
+    return executor.submit(contextvars.copy_context().run, fn, *args)
+
+class RegionOutput:
+    """
+        Stands in for sys.stdout while commands run in several regions at once.  Each region's output is buffered and printed as one block when the region finishes, instead of interleaving line by line.
+    """
+    def __init__(self, stream):
+        self.stream = stream
+        self.captured = contextvars.ContextVar('region_output', default=None)
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def buffered(self):
+        token = self.captured.set(io.StringIO())
+        try:
+            yield
+        finally:
+            output = self.captured.get().getvalue()
+            self.captured.reset(token)
+            with self.lock:
+                self.stream.write(output)
+                self.stream.flush()
+
+    def write(self, text):
+        captured = self.captured.get()
+        if captured is not None:
+            return captured.write(text)
+        with self.lock:
+            return self.stream.write(text)
+
+    def flush(self):
+        if self.captured.get() is None:
+            self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+class SharedCredentialProvider:
+    """
+        Hands the credentials resolved once for a multi-region run to a botocore session, in place of its own credential resolution.
+    """
+    def __init__(self, credentials):
+        self.credentials = credentials
+
+    def load_credentials(self):
+        return self.credentials
+
+def get_pooled_session(session_args, limit_concurrency=False, credentials=None):
+    #Sessions, and the clients they create, are shared for the lifetime of the process since building them is expensive.
+    session_key = tuple(sorted(session_args.items())) + (id(credentials),)
+    with session_pool_lock:
+        if session_key not in session_pool:
+            if credentials is not None:
+                botocore_session = botocore.session.Session()
+                botocore_session.register_component('credential_provider', SharedCredentialProvider(credentials))
+                session_args = dict(session_args, botocore_session=botocore_session)
+            my_session = boto3.session.Session(**session_args)
+            if limit_concurrency:
+                limit_api_concurrency(my_session)
+            session_pool[session_key] = PooledSession(my_session)
+        return session_pool[session_key]
+
+class PooledSession:
+    """
+        Wraps a boto3 Session so that clients are created once per service and can be shared between threads.
+    """
+    def __init__(self, session):
+        self.session = session
+        self.clients = {}
+        self.lock = threading.Lock()
+
+    def client(self, service_name, **kwargs):
+        #boto3 Sessions are not thread-safe, but the clients they create are.
+        with self.lock:
+            if kwargs:
+                return self.session.client(service_name, **kwargs)
+            if service_name not in self.clients:
+                self.clients[service_name] = self.session.client(service_name, config=botocore.config.Config(max_pool_connections=CLIENT_MAX_POOL_CONNECTIONS))
+            return self.clients[service_name]
+
+    def resource(self, service_name, **kwargs):
+        #Resources are not thread-safe, so every caller gets its own.
+        with self.lock:
+            return self.session.resource(service_name, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
+
+class RuleCatalog:
+    """
+        Process-wide cache of parsed Rule parameters files.  Entries are invalidated whenever the file's mtime or size changes.
+    """
+    def __init__(self):
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def get_rule_parameters(self, rule_name):
+        #Callers are free to modify what they get back, so they always receive their own copy.
+        params_file_path = os.path.join(os.getcwd(), rules_dir, rule_name, parameter_file_name)
+        file_stat = os.stat(params_file_path)
+        file_version = (file_stat.st_mtime_ns, file_stat.st_size)
+
+        with self.lock:
+            entry = self.entries.get(params_file_path)
+
+        if entry is None or entry[0] != file_version:
+            with open(params_file_path, 'r') as parameters_file:
+                my_json = json.load(parameters_file)
+            entry = (file_version, self.__normalize_parameters(my_json))
+            with self.lock:
+                self.entries[params_file_path] = entry
+
+        return copy.deepcopy(entry[1])
+
+    def invalidate(self, rule_name):
+        with self.lock:
+            self.entries.pop(os.path.join(os.getcwd(), rules_dir, rule_name, parameter_file_name), None)
+
+    def __normalize_parameters(self, my_json):
+        my_tags = my_json.get('Tags', None)
+
+        #Needed for backwards compatibility with earlier versions of parameters file
+        if my_tags is None:
+            my_tags = "[]"
+            my_json['Parameters']['Tags'] = my_tags
+
+        #as my_tags was returned as a string in earlier versions, convert it back to a list
+        if isinstance(my_tags, str):
+            my_tags = json.loads(my_tags)
+
+        return my_json['Parameters'], my_tags
+
+rule_catalog = RuleCatalog()
+
+class WorkspaceIndex:
+    """
+        Index of the Rule directories in the working directory, persisted under .rdk between invocations.
+        Each directory is only rescanned when its own mtime or the mtime of its parameters file has changed.
+        An inverted RuleSet -> Rules map is kept alongside, and updated incrementally as Rules change.
+    """
+    def __init__(self):
+        self.rules = None
+        self.rulesets = None
+        self.lock = threading.Lock()
+
+    def get_rule_names(self):
+        with self.lock:
+            self.__refresh()
+            return sorted(rule_name for rule_name, entry in self.rules.items() if entry['IsRule'])
+
+    def get_rulesets(self):
+        with self.lock:
+            self.__refresh()
+            return sorted(self.rulesets)
+
+    def get_rules_in_rulesets(self, rulesets):
+        with self.lock:
+            self.__refresh()
+            rule_names = set()
+            for ruleset in rulesets:
+                rule_names.update(self.rulesets.get(ruleset, []))
+            return sorted(rule_names)
+
+    def update_rule(self, rule_name):
+        #Called after rdk itself rewrites a parameters file, so the next refresh does not have to rediscover the change.
+        with self.lock:
+            if self.rules is None:
+                self.__load()
+            self.__set_rule_entry(rule_name, self.__index_rule(rule_name))
+            self.__save()
+
+    def __refresh(self):
+        if self.rules is None:
+            self.__load()
+
+        changed = False
+        found_rule_names = set()
+        with os.scandir('.') as dir_entries:
+            for dir_entry in dir_entries:
+                if not dir_entry.is_dir() or dir_entry.name in ['rdk', rdk_dir]:
+                    continue
+
+                found_rule_names.add(dir_entry.name)
+                entry = self.rules.get(dir_entry.name)
+                params_mtime = self.__get_params_mtime(dir_entry.name)
+                #Java and C# Rule code can appear deep inside a subdirectory, which does not change the Rule directory's own mtime, so check for it directly.
+                if entry is None or entry['Mtime'] != dir_entry.stat().st_mtime_ns or entry['ParamsMtime'] != params_mtime or (params_mtime is None and entry.get('HasRuleCode') != self.__has_rule_code(dir_entry.name)):
+                    self.__set_rule_entry(dir_entry.name, self.__index_rule(dir_entry.name))
+                    changed = True
+
+        for rule_name in set(self.rules) - found_rule_names:
+            self.__set_rule_entry(rule_name, None)
+            changed = True
+
+        if changed:
+            self.__save()
+
+    def __set_rule_entry(self, rule_name, entry):
+        old_entry = self.rules.pop(rule_name, None)
+        if old_entry:
+            for ruleset in old_entry['RuleSets']:
+                self.rulesets[ruleset].remove(rule_name)
+                if not self.rulesets[ruleset]:
+                    del self.rulesets[ruleset]
+
+        if entry:
+            self.rules[rule_name] = entry
+            for ruleset in entry['RuleSets']:
+                self.rulesets.setdefault(ruleset, []).append(rule_name)
+
+    def __index_rule(self, rule_name):
+        #Mirrors what rdk considers a Rule directory: a parameters file, a file named after the directory, or Java/C# Rule code.
+        #Take the mtime before scanning, so that changes made during the scan are picked up by the next refresh.
+        dir_mtime = os.stat(rule_name).st_mtime_ns
+        with os.scandir(rule_name) as file_entries:
+            file_names = [file_entry.name for file_entry in file_entries]
+
+        params_mtime = self.__get_params_mtime(rule_name)
+        has_rule_code = self.__has_rule_code(rule_name)
+        is_rule = params_mtime is not None or has_rule_code or any(file_name.split('.')[0] == rule_name for file_name in file_names)
+
+        rulesets = []
+        if params_mtime is not None:
+            try:
+                params, tags = rule_catalog.get_rule_parameters(rule_name)
+                rulesets = sorted(set(params.get('RuleSets', [])))
+            except (IOError, ValueError, KeyError) as e:
+                #Leave the entry unvalidated so that it is retried on the next refresh.
+                print("Unable to read parameters file for Rule " + rule_name + ": " + str(e))
+                params_mtime = None
+
+        return {
+            'Mtime': dir_mtime,
+            'ParamsMtime': params_mtime,
+            'IsRule': is_rule,
+            'HasRuleCode': has_rule_code,
+            'RuleSets': rulesets
+        }
+
+    def __has_rule_code(self, rule_name):
+        return os.path.exists(os.path.join(rule_name, 'src', 'main', 'java', 'com', 'rdk', 'RuleCode.java')) or os.path.exists(os.path.join(rule_name, 'RuleCode.cs'))
+
+    def __get_params_mtime(self, rule_name):
+        try:
+            return os.stat(os.path.join(rule_name, parameter_file_name)).st_mtime_ns
+        except OSError:
+            return None
+
+    def __load(self):
+        try:
+            with open(os.path.join(rdk_dir, workspace_index_filename), 'r') as f:
+                index = json.load(f)
+            self.rules = index['Rules']
+            self.rulesets = index['RuleSets']
+        except (IOError, ValueError, KeyError):
+            self.rules = {}
+            self.rulesets = {}
+
+    def __save(self):
+        #Write to a process-specific temporary file and rename it, so concurrent invocations never see a partial index.
+        index_file = os.path.join(rdk_dir, workspace_index_filename)
+        try:
+            os.makedirs(rdk_dir, exist_ok=True)
+            tmp_index_file = index_file + "." + str(os.getpid())
+            with open(tmp_index_file, 'w') as f:
+                json.dump({'Rules': self.rules, 'RuleSets': self.rulesets}, f, indent=2, sort_keys=True)
+            os.replace(tmp_index_file, index_file)
+        except OSError:
+            #The index is only an optimization, so a read-only workspace is not an error.
+            pass
+
+workspace_index = WorkspaceIndex()
+
+def limit_api_concurrency(session):
+    #Bound the number of in-flight calls per AWS service, shared across every session that registers these handlers.
+    session.events.register('before-call', acquire_api_slot)
+    session.events.register('after-call', release_api_slot)
+    session.events.register('after-call-error', release_api_slot)
+
+def acquire_api_slot(event_name, context, **kwargs):
+    service_name = event_name.split('.')[1]
+    with api_semaphores_lock:
+        if service_name not in api_semaphores:
+            api_semaphores[service_name] = threading.BoundedSemaphore(MULTI_REGION_API_CONCURRENCY)
+        semaphore = api_semaphores[service_name]
+
+    semaphore.acquire()
+    context['rdk_api_semaphore'] = semaphore
+
+def release_api_slot(context, **kwargs):
+    semaphore = context.pop('rdk_api_semaphore', None)
+    if semaphore:
+        semaphore.release()
+
 
 class rdk:
     def __init__(self, args):
         self.args = args
+        #The newest stack event printed for each stack, so that a later wait on the same stack does not print its events again.
+        self.seen_stack_events = {}
 
     @staticmethod
     def get_command_parser(self):
@@ -491,6 +1180,25 @@ class rdk:
 
         return(exit_code)
 
+    def build_packages(self):
+        if self.args.command == 'deploy-organization':
+            self.__parse_deploy_organization_args()
+        elif self.args.command == 'export':
+            self.__parse_export_args()
+        else:
+            self.__parse_deploy_args()
+
+        rule_names = self.__get_rule_list_for_command(self.args.command)
+        print(f"Building packages for {len(rule_names)} Rules.")
+        source_hashes = {}
+        for rule_name in rule_names:
+            rule_params, cfn_tags = self.__get_rule_parameters(rule_name)
+            if 'SourceIdentifier' not in rule_params:
+                source_hashes[rule_name] = self.__get_rule_source_hash(rule_name, rule_params)
+                self.__get_rule_package(rule_name, rule_params, source_hashes[rule_name])
+
+        return source_hashes
+
     def init(self):
         """
             This is a test.
@@ -778,7 +1486,7 @@ class rdk:
             response = cfn_client.describe_stacks(StackName="RDK-Config-Rule-Functions")
             if response["Stacks"]:
                 cfn_client.delete_stack(StackName="RDK-Config-Rule-Functions")
-        except ClientError as ce:
+        except botocore.exceptions.ClientError as ce:
             if ce.response['Error']['Code'] == "ValidationError":
                 print("No Functions stack found.")
         except Exception as e:
@@ -790,7 +1498,7 @@ class rdk:
             code_bucket = my_session.resource("s3").Bucket(code_bucket_name)
             code_bucket.objects.all().delete()
             code_bucket.delete()
-        except ClientError as ce:
+        except botocore.exceptions.ClientError as ce:
             if ce.response['Error']['Code'] == "NoSuchBucket":
                 print("No code bucket found.")
         except Exception as e:
@@ -874,6 +1582,15 @@ class rdk:
                             print(line.replace('<%RuleName%>', self.args.rulename), end='')
                         f.close()
 
+                    src = os.path.join(path.dirname(__file__), 'template', 'runtime', self.args.runtime, 'rule_benchmark' + extension_mapping[self.args.runtime])
+                    if os.path.exists(src):
+                        dst = os.path.join(os.getcwd(), rules_dir, self.args.rulename, self.args.rulename+"_benchmark"+extension_mapping[self.args.runtime])
+                        shutil.copyfile(src, dst)
+                        f = fileinput.input(files=dst, inplace=True)
+                        for line in f:
+                            print(line.replace('<%RuleName%>', self.args.rulename), end='')
+                        f.close()
+
                     src = os.path.join(path.dirname(__file__), 'template', 'runtime', self.args.runtime, util_filename + extension_mapping[self.args.runtime])
                     if os.path.exists(src):
                         dst = os.path.join(os.getcwd(), rules_dir, self.args.rulename, util_filename + extension_mapping[self.args.runtime])
@@ -981,7 +1698,7 @@ class rdk:
             try:
                 cfn_client.delete_stack(StackName=self.args.stack_name)
                 deleted_stacks.append(self.args.stack_name)
-            except ClientError as ce:
+            except botocore.exceptions.ClientError as ce:
                 print(f"[{my_session.region_name}]: Client Error encountered attempting to delete CloudFormation stack for Lambda Functions: " + str(ce))
             except Exception as e:
                 print(f"[{my_session.region_name}]: Exception encountered attempting to delete CloudFormation stack for Lambda Functions: " + str(e))
@@ -992,15 +1709,14 @@ class rdk:
             try:
                 cfn_client.delete_stack(StackName=self.__get_stack_name_from_rule_name(rule_name))
                 deleted_stacks.append(self.__get_stack_name_from_rule_name(rule_name))
-            except ClientError as ce:
+            except botocore.exceptions.ClientError as ce:
                 print(f"[{my_session.region_name}]: Client Error encountered attempting to delete CloudFormation stack for Rule: " + str(ce))
             except Exception as e:
                 print(f"[{my_session.region_name}]: Exception encountered attempting to delete CloudFormation stack for Rule: " + str(e))
 
         print(f"[{my_session.region_name}]: Rule removal initiated. Waiting for Stack Deletion to complete.")
 
-        for stack_name in deleted_stacks:
-            self.__wait_for_cfn_stack(cfn_client, stack_name)
+        self.__wait_for_cfn_stacks(cfn_client, deleted_stacks)
 
         print(f"[{my_session.region_name}]: Rule removal complete, but local files have been preserved.")
         print(f"[{my_session.region_name}]: To re-deploy, use the 'deploy' command.")
@@ -1034,7 +1750,7 @@ class rdk:
             try:
                 cfn_client.delete_stack(StackName=self.args.stack_name)
                 deleted_stacks.append(self.args.stack_name)
-            except ClientError as ce:
+            except botocore.exceptions.ClientError as ce:
                 print("Client Error encountered attempting to delete CloudFormation stack for Lambda Functions: " + str(ce))
             except Exception as e:
                 print("Exception encountered attempting to delete CloudFormation stack for Lambda Functions: " + str(e))
@@ -1045,15 +1761,14 @@ class rdk:
             try:
                 cfn_client.delete_stack(StackName=self.__get_stack_name_from_rule_name(rule_name))
                 deleted_stacks.append(self.__get_stack_name_from_rule_name(rule_name))
-            except ClientError as ce:
+            except botocore.exceptions.ClientError as ce:
                 print("Client Error encountered attempting to delete CloudFormation stack for Rule: " + str(ce))
             except Exception as e:
                 print("Exception encountered attempting to delete CloudFormation stack for Rule: " + str(e))
 
         print("Rule removal initiated. Waiting for Stack Deletion to complete.")
 
-        for stack_name in deleted_stacks:
-            self.__wait_for_cfn_stack(cfn_client, stack_name)
+        self.__wait_for_cfn_stacks(cfn_client, deleted_stacks)
 
         print("Rule removal complete, but local files have been preserved.")
         print("To re-deploy, use the 'deploy-organization' command.")
@@ -1116,8 +1831,7 @@ class rdk:
             my_cfn = my_session.client('cloudformation')
 
             # Generate the template_url regardless of region using the s3 sdk
-            config = my_s3_client._client_config
-            config.signature_version = botocore.UNSIGNED
+            config = my_s3_client._client_config.merge(botocore.config.Config(signature_version=botocore.UNSIGNED))
             template_url = boto3.client('s3', config=config).generate_presigned_url('get_object', ExpiresIn=0, Params={'Bucket': code_bucket_name, 'Key': self.args.stack_name + ".json"})
 
             # Check if stack exists.  If it does, update it.  If it doesn't, create it.
@@ -1144,7 +1858,7 @@ class rdk:
 
                     #wait for changes to propagate.
                     self.__wait_for_cfn_stack(my_cfn, self.args.stack_name)
-                except ClientError as e:
+                except botocore.exceptions.ClientError as e:
                     if e.response['Error']['Code'] == 'ValidationError':
                         if 'No updates are to be performed.' in str(e):
                             #No changes made to Config rule definition, so CloudFormation won't do anything.
@@ -1164,16 +1878,8 @@ class rdk:
                         print(f"[{my_session.region_name}]: Skipping Lambda upload for Managed Rule.")
                         continue
 
-                    print(f"[{my_session.region_name}]: Publishing Lambda code...")
-                    my_lambda_client = my_session.client('lambda')
-                    my_lambda_client.update_function_code(
-                        FunctionName=my_lambda_arn,
-                        S3Bucket=code_bucket_name,
-                        S3Key=s3_code_objects[rule_name],
-                        Publish=True
-                    )
-                    print(f"[{my_session.region_name}]: Lambda code updated.")
-            except ClientError as e:
+                    self.__publish_function_code(my_session, my_lambda_arn, code_bucket_name, s3_code_objects[rule_name])
+            except botocore.exceptions.ClientError as e:
                 #If we're in the exception, the stack does not exist and we should create it.
                 print (f"[{my_session.region_name}]: Creating CloudFormation Stack for Lambda Functions.")
 
@@ -1197,416 +1903,488 @@ class rdk:
             sys.exit(0)
 
         #If we're deploying both the functions and the Config rules, run the following process:
+        if self.args.parallel > 1:
+            return self.__deploy_rules_in_parallel(rule_names, account_id, partition, code_bucket_name)
+
         for rule_name in rule_names:
-            rule_params, cfn_tags = self.__get_rule_parameters(rule_name)
+            deployment = self.__submit_rule_deployment(rule_name, my_session, account_id, partition, code_bucket_name)
+            if deployment['Status'] == 'FAILED':
+                return 1
 
-            #create CFN Parameters common for Managed and Custom
-            source_events = "NONE"
-            if 'SourceEvents' in rule_params:
-                source_events = rule_params['SourceEvents']
+            self.__complete_rule_deployment(deployment, my_session)
 
-            source_periodic = "NONE"
-            if 'SourcePeriodic' in rule_params:
-                source_periodic = rule_params['SourcePeriodic']
+        print(f'[{my_session.region_name}]: Config deploy complete.')
 
-            combined_input_parameters = {}
-            if 'InputParameters' in rule_params:
-                combined_input_parameters.update(json.loads(rule_params['InputParameters']))
+        return 0
 
-            if 'OptionalParameters' in rule_params:
-                #Remove empty parameters
-                keys_to_delete = []
-                optional_parameters_json = json.loads(rule_params['OptionalParameters'])
-                for key, value in optional_parameters_json.items():
-                    if not value:
-                        keys_to_delete.append(key)
-                for key in keys_to_delete:
-                    del optional_parameters_json[key]
-                combined_input_parameters.update(optional_parameters_json)
+    def __submit_rule_deployment(self, rule_name, my_session, account_id, partition, code_bucket_name):
+        rule_params, cfn_tags = self.__get_rule_parameters(rule_name)
+
+        #Track what still needs to happen once the CloudFormation operation has been submitted.
+        deployment = {
+            'RuleName': rule_name,
+            'StackName': self.__get_stack_name_from_rule_name(rule_name),
+            'Status': 'SUBMITTED',
+            'CodeBucket': code_bucket_name,
+            'CodeKey': None,
+            'Tags': None
+        }
 
-            if 'SourceIdentifier' in rule_params:
-                print("Found Managed Rule.")
-                #create CFN Parameters for Managed Rules
+        #create CFN Parameters common for Managed and Custom
+        source_events = "NONE"
+        if 'SourceEvents' in rule_params:
+            source_events = rule_params['SourceEvents']
+
+        source_periodic = "NONE"
+        if 'SourcePeriodic' in rule_params:
+            source_periodic = rule_params['SourcePeriodic']
+
+        combined_input_parameters = {}
+        if 'InputParameters' in rule_params:
+            combined_input_parameters.update(json.loads(rule_params['InputParameters']))
+
+        if 'OptionalParameters' in rule_params:
+            #Remove empty parameters
+            keys_to_delete = []
+            optional_parameters_json = json.loads(rule_params['OptionalParameters'])
+            for key, value in optional_parameters_json.items():
+                if not value:
+                    keys_to_delete.append(key)
+            for key in keys_to_delete:
+                del optional_parameters_json[key]
+            combined_input_parameters.update(optional_parameters_json)
+
+        if 'SourceIdentifier' in rule_params:
+            print("Found Managed Rule.")
+            #create CFN Parameters for Managed Rules
 
-                try:
-                    rule_description = rule_params["Description"]
-                except KeyError:
-                    rule_description = rule_name
-                my_params = [
-                    {
-                        'ParameterKey': 'RuleName',
-                        'ParameterValue': rule_name,
-                    },
-                    {
-                        'ParameterKey': 'Description',
-                        'ParameterValue': rule_description,
-                    },
-                    {
-                        'ParameterKey': 'SourceEvents',
-                        'ParameterValue': source_events,
-                    },
-                    {
-                        'ParameterKey': 'SourcePeriodic',
-                        'ParameterValue': source_periodic,
-                    },
-                    {
-                        'ParameterKey': 'SourceInputParameters',
-                        'ParameterValue': json.dumps(combined_input_parameters),
-                    },
-                    {
-                        'ParameterKey': 'SourceIdentifier',
-                        'ParameterValue': rule_params['SourceIdentifier']
-                    }]
-                my_cfn = my_session.client('cloudformation')
-                if "Remediation" in rule_params:
-                    print(f'[{my_session.region_name}]: Build The CFN Template with Remediation Settings')
-                    cfn_body = os.path.join(path.dirname(__file__), 'template',  "configManagedRuleWithRemediation.json")
-                    template_body = open(cfn_body, "r").read()
-                    json_body = json.loads(template_body)
-                    remediation = self.__create_remediation_cloudformation_block(rule_params["Remediation"])
-                    json_body["Resources"]["Remediation"] = remediation
-
-                    if "SSMAutomation" in rule_params:
-                        #Reference the SSM Automation Role Created, if IAM is created
-                        print(f'[{my_session.region_name}]: Building SSM Automation Section')
-                        ssm_automation = self.__create_automation_cloudformation_block(rule_params['SSMAutomation'], self.__get_alphanumeric_rule_name(rule_name))
-                        json_body["Resources"][self.__get_alphanumeric_rule_name(rule_name+'RemediationAction')] = ssm_automation
-                        if "IAM" in rule_params['SSMAutomation']:
-                            print(f'[{my_session.region_name}]: Lets Build IAM Role and Policy')
-                            #TODO Check For IAM Settings
-                            json_body["Resources"]['Remediation']['Properties']['Parameters']['AutomationAssumeRole']['StaticValue']['Values'] = [{"Fn::GetAtt":[self.__get_alphanumeric_rule_name(rule_name+"Role"), "Arn"]}]
-
-                            ssm_iam_role, ssm_iam_policy = self.__create_automation_iam_cloudformation_block(rule_params['SSMAutomation'], self.__get_alphanumeric_rule_name(rule_name))
-                            json_body["Resources"][self.__get_alphanumeric_rule_name(rule_name+'Role')] = ssm_iam_role
-                            json_body["Resources"][self.__get_alphanumeric_rule_name(rule_name+'Policy')] = ssm_iam_policy
-
-                            print(f'[{my_session.region_name}]: Build Supporting SSM Resources')
-                            resource_depends_on = ['rdkConfigRule', self.__get_alphanumeric_rule_name(rule_name+"RemediationAction")]
-                            #Builds SSM Document Before Config RUle
-                            json_body["Resources"]["Remediation"]['DependsOn'] = resource_depends_on
-                            json_body["Resources"]["Remediation"]['Properties']['TargetId'] = {'Ref': self.__get_alphanumeric_rule_name(rule_name+"RemediationAction")}
+            try:
+                rule_description = rule_params["Description"]
+            except KeyError:
+                rule_description = rule_name
+            my_params = [
+                {
+                    'ParameterKey': 'RuleName',
+                    'ParameterValue': rule_name,
+                },
+                {
+                    'ParameterKey': 'Description',
+                    'ParameterValue': rule_description,
+                },
+                {
+                    'ParameterKey': 'SourceEvents',
+                    'ParameterValue': source_events,
+                },
+                {
+                    'ParameterKey': 'SourcePeriodic',
+                    'ParameterValue': source_periodic,
+                },
+                {
+                    'ParameterKey': 'SourceInputParameters',
+                    'ParameterValue': json.dumps(combined_input_parameters),
+                },
+                {
+                    'ParameterKey': 'SourceIdentifier',
+                    'ParameterValue': rule_params['SourceIdentifier']
+                }]
+            my_cfn = my_session.client('cloudformation')
+            if "Remediation" in rule_params:
+                print(f'[{my_session.region_name}]: Build The CFN Template with Remediation Settings')
+                cfn_body = os.path.join(path.dirname(__file__), 'template',  "configManagedRuleWithRemediation.json")
+                template_body = open(cfn_body, "r").read()
+                json_body = json.loads(template_body)
+                remediation = self.__create_remediation_cloudformation_block(rule_params["Remediation"])
+                json_body["Resources"]["Remediation"] = remediation
+
+                if "SSMAutomation" in rule_params:
+                    #Reference the SSM Automation Role Created, if IAM is created
+                    print(f'[{my_session.region_name}]: Building SSM Automation Section')
+                    ssm_automation = self.__create_automation_cloudformation_block(rule_params['SSMAutomation'], self.__get_alphanumeric_rule_name(rule_name))
+                    json_body["Resources"][self.__get_alphanumeric_rule_name(rule_name+'RemediationAction')] = ssm_automation
+                    if "IAM" in rule_params['SSMAutomation']:
+                        print(f'[{my_session.region_name}]: Lets Build IAM Role and Policy')
+                        #TODO Check For IAM Settings
+                        json_body["Resources"]['Remediation']['Properties']['Parameters']['AutomationAssumeRole']['StaticValue']['Values'] = [{"Fn::GetAtt":[self.__get_alphanumeric_rule_name(rule_name+"Role"), "Arn"]}]
+
+                        ssm_iam_role, ssm_iam_policy = self.__create_automation_iam_cloudformation_block(rule_params['SSMAutomation'], self.__get_alphanumeric_rule_name(rule_name))
+                        json_body["Resources"][self.__get_alphanumeric_rule_name(rule_name+'Role')] = ssm_iam_role
+                        json_body["Resources"][self.__get_alphanumeric_rule_name(rule_name+'Policy')] = ssm_iam_policy
+
+                        print(f'[{my_session.region_name}]: Build Supporting SSM Resources')
+                        resource_depends_on = ['rdkConfigRule', self.__get_alphanumeric_rule_name(rule_name+"RemediationAction")]
+                        #Builds SSM Document Before Config RUle
+                        json_body["Resources"]["Remediation"]['DependsOn'] = resource_depends_on
+                        json_body["Resources"]["Remediation"]['Properties']['TargetId'] = {'Ref': self.__get_alphanumeric_rule_name(rule_name+"RemediationAction")}
 
+                try:
+                    my_stack_name = self.__get_stack_name_from_rule_name(rule_name)
+                    my_stack = my_cfn.describe_stacks(StackName=my_stack_name)
+                    #If we've gotten here, stack exists and we should update it.
+                    print (f"[{my_session.region_name}]: Updating CloudFormation Stack for " + rule_name)
                     try:
-                        my_stack_name = self.__get_stack_name_from_rule_name(rule_name)
-                        my_stack = my_cfn.describe_stacks(StackName=my_stack_name)
-                        #If we've gotten here, stack exists and we should update it.
-                        print (f"[{my_session.region_name}]: Updating CloudFormation Stack for " + rule_name)
-                        try:
-                            cfn_args = {
-                                'StackName': my_stack_name,
-                                'TemplateBody': json.dumps(json_body,indent=2),
-                                'Parameters': my_params,
-                                'Capabilities': ['CAPABILITY_IAM', 'CAPABILITY_NAMED_IAM']
-                            }
+                        cfn_args = {
+                            'StackName': my_stack_name,
+                            'TemplateBody': json.dumps(json_body,indent=2),
+                            'Parameters': my_params,
+                            'Capabilities': ['CAPABILITY_IAM', 'CAPABILITY_NAMED_IAM']
+                        }
+
+                        # If no tags key is specified, or if the tags dict is empty
+                        if cfn_tags is not None:
+                            cfn_args['Tags'] = cfn_tags
 
-                            # If no tags key is specified, or if the tags dict is empty
-                            if cfn_tags is not None:
-                                cfn_args['Tags'] = cfn_tags
-
-                            response = my_cfn.update_stack(**cfn_args)
-                        except ClientError as e:
-                            if e.response['Error']['Code'] == 'ValidationError':
-                                if 'No updates are to be performed.' in str(e):
-                                    #No changes made to Config rule definition, so CloudFormation won't do anything.
-                                    print(f"[{my_session.region_name}]: No changes to Config Rule.")
-                                else:
-                                    #Something unexpected has gone wrong.  Emit an error and bail.
-                                    print(e)
-                                    return 1
+                        response = my_cfn.update_stack(**cfn_args)
+                    except botocore.exceptions.ClientError as e:
+                        if e.response['Error']['Code'] == 'ValidationError':
+                            if 'No updates are to be performed.' in str(e):
+                                #No changes made to Config rule definition, so CloudFormation won't do anything.
+                                print(f"[{my_session.region_name}]: No changes to Config Rule.")
                             else:
-                                raise
-                    except ClientError as e:
-                        #If we're in the exception, the stack does not exist and we should create it.
-                        print (f"[{my_session.region_name}]: Creating CloudFormation Stack for " + rule_name)
-
-                        if "Remediation" in rule_params:
-                            cfn_args = {
-                                'StackName': my_stack_name,
-                                'TemplateBody': json.dumps(json_body,indent=2),
-                                'Parameters': my_params,
-                                'Capabilities': ['CAPABILITY_IAM', 'CAPABILITY_NAMED_IAM']
-                            }
+                                #Something unexpected has gone wrong.  Emit an error and bail.
+                                print(e)
+                                deployment['Status'] = 'FAILED'
+                                return deployment
+                        else:
+                            raise
+                except botocore.exceptions.ClientError as e:
+                    #If we're in the exception, the stack does not exist and we should create it.
+                    print (f"[{my_session.region_name}]: Creating CloudFormation Stack for " + rule_name)
 
+                    if "Remediation" in rule_params:
+                        cfn_args = {
+                            'StackName': my_stack_name,
+                            'TemplateBody': json.dumps(json_body,indent=2),
+                            'Parameters': my_params,
+                            'Capabilities': ['CAPABILITY_IAM', 'CAPABILITY_NAMED_IAM']
+                        }
 
-                        else:
-                            cfn_args = {
-                                'StackName': my_stack_name,
-                                'TemplateBody': open(cfn_body, "r").read(),
-                                'Parameters': my_params
-                            }
 
-                        if cfn_tags is not None:
-                            cfn_args['Tags'] = cfn_tags
+                    else:
+                        cfn_args = {
+                            'StackName': my_stack_name,
+                            'TemplateBody': open(cfn_body, "r").read(),
+                            'Parameters': my_params
+                        }
 
-                        response = my_cfn.create_stack(**cfn_args)
+                    if cfn_tags is not None:
+                        cfn_args['Tags'] = cfn_tags
 
-                    #wait for changes to propagate.
-                    self.__wait_for_cfn_stack(my_cfn, my_stack_name)
-                    continue
+                    response = my_cfn.create_stack(**cfn_args)
 
-                else:
-                #deploy config rule
-                    cfn_body = os.path.join(path.dirname(__file__), 'template',  "configManagedRule.json")
+                return deployment
 
-                    try:
-                        my_stack_name = self.__get_stack_name_from_rule_name(rule_name)
-                        my_stack = my_cfn.describe_stacks(StackName=my_stack_name)
-                        #If we've gotten here, stack exists and we should update it.
-                        print (f"[{self.args.region}]: Updating CloudFormation Stack for " + rule_name)
-                        try:
-                            cfn_args = {
-                                'StackName': my_stack_name,
-                                'TemplateBody': open(cfn_body, "r").read(),
-                                'Parameters': my_params
-                            }
+            else:
+            #deploy config rule
+                cfn_body = os.path.join(path.dirname(__file__), 'template',  "configManagedRule.json")
 
-                            # If no tags key is specified, or if the tags dict is empty
-                            if cfn_tags is not None:
-                                cfn_args['Tags'] = cfn_tags
-
-                            response = my_cfn.update_stack(**cfn_args)
-                        except ClientError as e:
-                            if e.response['Error']['Code'] == 'ValidationError':
-                                if 'No updates are to be performed.' in str(e):
-                                    #No changes made to Config rule definition, so CloudFormation won't do anything.
-                                    print(f"[{my_session.region_name}]: No changes to Config Rule.")
-                                else:
-                                    #Something unexpected has gone wrong.  Emit an error and bail.
-                                    print(f"[{my_session.region_name}]:  {e}")
-                                    return 1
-                            else:
-                                raise
-                    except ClientError as e:
-                        #If we're in the exception, the stack does not exist and we should create it.
-                        print (f"[{self.args.region}]: Creating CloudFormation Stack for " + rule_name)
+                try:
+                    my_stack_name = self.__get_stack_name_from_rule_name(rule_name)
+                    my_stack = my_cfn.describe_stacks(StackName=my_stack_name)
+                    #If we've gotten here, stack exists and we should update it.
+                    print (f"[{self.args.region}]: Updating CloudFormation Stack for " + rule_name)
+                    try:
                         cfn_args = {
                             'StackName': my_stack_name,
                             'TemplateBody': open(cfn_body, "r").read(),
                             'Parameters': my_params
                         }
 
+                        # If no tags key is specified, or if the tags dict is empty
                         if cfn_tags is not None:
                             cfn_args['Tags'] = cfn_tags
 
-                        response = my_cfn.create_stack(**cfn_args)
+                        response = my_cfn.update_stack(**cfn_args)
+                    except botocore.exceptions.ClientError as e:
+                        if e.response['Error']['Code'] == 'ValidationError':
+                            if 'No updates are to be performed.' in str(e):
+                                #No changes made to Config rule definition, so CloudFormation won't do anything.
+                                print(f"[{my_session.region_name}]: No changes to Config Rule.")
+                            else:
+                                #Something unexpected has gone wrong.  Emit an error and bail.
+                                print(f"[{my_session.region_name}]:  {e}")
+                                deployment['Status'] = 'FAILED'
+                                return deployment
+                        else:
+                            raise
+                except botocore.exceptions.ClientError as e:
+                    #If we're in the exception, the stack does not exist and we should create it.
+                    print (f"[{self.args.region}]: Creating CloudFormation Stack for " + rule_name)
+                    cfn_args = {
+                        'StackName': my_stack_name,
+                        'TemplateBody': open(cfn_body, "r").read(),
+                        'Parameters': my_params
+                    }
 
-                    #wait for changes to propagate.
-                    self.__wait_for_cfn_stack(my_cfn, my_stack_name)
+                    if cfn_tags is not None:
+                        cfn_args['Tags'] = cfn_tags
 
-                #Cloudformation is not supporting tagging config rule currently.
-                if cfn_tags is not None and len(cfn_tags) > 0:
-                    self.__tag_config_rule(rule_name, cfn_tags, my_session)
+                    response = my_cfn.create_stack(**cfn_args)
 
-                continue
+            #Cloudformation is not supporting tagging config rule currently.
+            if cfn_tags is not None and len(cfn_tags) > 0:
+                deployment['Tags'] = cfn_tags
 
-            print(f"[{my_session.region_name}]: Found Custom Rule.")
+            return deployment
 
-            s3_src = ""
-            s3_dst = self.__upload_function_code(rule_name, rule_params, account_id, my_session, code_bucket_name)
+        print(f"[{my_session.region_name}]: Found Custom Rule.")
 
-            #create CFN Parameters for Custom Rules
-            lambdaRoleArn = ""
-            if self.args.lambda_role_arn:
-                print (f"[{my_session.region_name}]: Existing IAM Role provided: " + self.args.lambda_role_arn)
-                lambdaRoleArn = self.args.lambda_role_arn
-            elif self.args.lambda_role_name:
-                print (f"[{my_session.region_name}]: Finding IAM Role: " + self.args.lambda_role_name)
-                arn = f"arn:{partition}:iam::{account_id}:role/Rdk-Lambda-Role"
-                lambdaRoleArn = arn
+        s3_src = ""
+        s3_dst = self.__upload_function_code(rule_name, rule_params, account_id, my_session, code_bucket_name)
 
-            if self.args.boundary_policy_arn:
-                print (f"[{my_session.region_name}]: Boundary Policy provided: " + self.args.boundary_policy_arn)
-                boundaryPolicyArn = self.args.boundary_policy_arn
-            else:
-                boundaryPolicyArn = ""
+        #create CFN Parameters for Custom Rules
+        lambdaRoleArn = ""
+        if self.args.lambda_role_arn:
+            print (f"[{my_session.region_name}]: Existing IAM Role provided: " + self.args.lambda_role_arn)
+            lambdaRoleArn = self.args.lambda_role_arn
+        elif self.args.lambda_role_name:
+            print (f"[{my_session.region_name}]: Finding IAM Role: " + self.args.lambda_role_name)
+            arn = f"arn:{partition}:iam::{account_id}:role/Rdk-Lambda-Role"
+            lambdaRoleArn = arn
 
-            try:
-                rule_description = rule_params["Description"]
-            except KeyError:
-                rule_description = rule_name
+        if self.args.boundary_policy_arn:
+            print (f"[{my_session.region_name}]: Boundary Policy provided: " + self.args.boundary_policy_arn)
+            boundaryPolicyArn = self.args.boundary_policy_arn
+        else:
+            boundaryPolicyArn = ""
 
-            my_params = [
-                {
-                    'ParameterKey': 'RuleName',
-                    'ParameterValue': rule_name,
-                },
-                {
-                    'ParameterKey': 'RuleLambdaName',
-                    'ParameterValue': self.__get_lambda_name(rule_name, rule_params),
-                },
-                {
-                    'ParameterKey': 'Description',
-                    'ParameterValue': rule_description,
-                },
-                {
-                    'ParameterKey': 'LambdaRoleArn',
-                    'ParameterValue': lambdaRoleArn,
-                },
-                {
-                    'ParameterKey': 'BoundaryPolicyArn',
-                    'ParameterValue': boundaryPolicyArn,
-                },
-                {
-                    'ParameterKey': 'SourceBucket',
-                    'ParameterValue': code_bucket_name,
-                },
-                {
-                    'ParameterKey': 'SourcePath',
-                    'ParameterValue': s3_dst,
-                },
-                {
-                    'ParameterKey': 'SourceRuntime',
-                    'ParameterValue': self.__get_runtime_string(rule_params),
-                },
-                {
-                    'ParameterKey': 'SourceEvents',
-                    'ParameterValue': source_events,
-                },
-                {
-                    'ParameterKey': 'SourcePeriodic',
-                    'ParameterValue': source_periodic,
-                },
-                {
-                    'ParameterKey': 'SourceInputParameters',
-                    'ParameterValue': json.dumps(combined_input_parameters),
-                },
-                {
-                    'ParameterKey': 'SourceHandler',
-                    'ParameterValue': self.__get_handler(rule_name, rule_params)
+        try:
+            rule_description = rule_params["Description"]
+        except KeyError:
+            rule_description = rule_name
 
-                },
-                {
-                    'ParameterKey': 'Timeout',
-                    'ParameterValue': str(self.args.lambda_timeout)
-                }]
-            layers = self.__get_lambda_layers(my_session, self.args, rule_params)
+        my_params = [
+            {
+                'ParameterKey': 'RuleName',
+                'ParameterValue': rule_name,
+            },
+            {
+                'ParameterKey': 'RuleLambdaName',
+                'ParameterValue': self.__get_lambda_name(rule_name, rule_params),
+            },
+            {
+                'ParameterKey': 'Description',
+                'ParameterValue': rule_description,
+            },
+            {
+                'ParameterKey': 'LambdaRoleArn',
+                'ParameterValue': lambdaRoleArn,
+            },
+            {
+                'ParameterKey': 'BoundaryPolicyArn',
+                'ParameterValue': boundaryPolicyArn,
+            },
+            {
+                'ParameterKey': 'SourceBucket',
+                'ParameterValue': code_bucket_name,
+            },
+            {
+                'ParameterKey': 'SourcePath',
+                'ParameterValue': s3_dst,
+            },
+            {
+                'ParameterKey': 'SourceRuntime',
+                'ParameterValue': self.__get_runtime_string(rule_params),
+            },
+            {
+                'ParameterKey': 'SourceEvents',
+                'ParameterValue': source_events,
+            },
+            {
+                'ParameterKey': 'SourcePeriodic',
+                'ParameterValue': source_periodic,
+            },
+            {
+                'ParameterKey': 'SourceInputParameters',
+                'ParameterValue': json.dumps(combined_input_parameters),
+            },
+            {
+                'ParameterKey': 'SourceHandler',
+                'ParameterValue': self.__get_handler(rule_name, rule_params)
 
-            if self.args.lambda_layers:
-                additional_layers = self.args.lambda_layers.split(',')
-                layers.extend(additional_layers)
+            },
+            {
+                'ParameterKey': 'Timeout',
+                'ParameterValue': str(self.args.lambda_timeout)
+            }]
+        layers = self.__get_lambda_layers(my_session, self.args, rule_params)
 
-            if layers:
-                my_params.append({
-                    'ParameterKey': 'Layers',
-                    'ParameterValue': ",".join(layers)
-                })
+        if self.args.lambda_layers:
+            additional_layers = self.args.lambda_layers.split(',')
+            layers.extend(additional_layers)
+
+        if layers:
+            my_params.append({
+                'ParameterKey': 'Layers',
+                'ParameterValue': ",".join(layers)
+            })
+
+
+        if self.args.lambda_security_groups and self.args.lambda_subnets:
+            my_params.append({
+                'ParameterKey': 'SecurityGroupIds',
+                'ParameterValue': self.args.lambda_security_groups
+            })
+            my_params.append({
+                'ParameterKey': 'SubnetIds',
+                'ParameterValue': self.args.lambda_subnets
+            })
+
+        #create json of CFN template
+        cfn_body = os.path.join(path.dirname(__file__), 'template',  "configRule.json")
+        template_body = open(cfn_body, "r").read()
+        json_body = json.loads(template_body)
+
+        remediation = ""
+        if "Remediation" in rule_params:
+            remediation = self.__create_remediation_cloudformation_block(rule_params["Remediation"])
+            json_body["Resources"]["Remediation"] = remediation
+
+            if "SSMAutomation" in rule_params:
+                ##AWS needs to build the SSM before the Config Rule
+                resource_depends_on = ['rdkConfigRule', self.__get_alphanumeric_rule_name(rule_name+"RemediationAction")]
+                remediation["DependsOn"] = resource_depends_on
+                #Add JSON Reference to SSM Document { "Ref" : "MyEC2Instance" }
+                remediation['Properties']['TargetId'] = {"Ref" : self.__get_alphanumeric_rule_name(rule_name+"RemediationAction") }
+
+        if "SSMAutomation" in rule_params:
+            print(f'[{my_session.region_name}]: Building SSM Automation Section')
+
+            ssm_automation = self.__create_automation_cloudformation_block(rule_params['SSMAutomation'], rule_name)
+            json_body["Resources"][self.__get_alphanumeric_rule_name(rule_name+"RemediationAction")] = ssm_automation
+            if "IAM" in rule_params['SSMAutomation']:
+                print('Lets Build IAM Role and Policy')
+                #TODO Check For IAM Settings
+                json_body["Resources"]['Remediation']['Properties']['Parameters']['AutomationAssumeRole']['StaticValue']['Values'] = [{"Fn::GetAtt":[self.__get_alphanumeric_rule_name(rule_name+"Role"), "Arn"]}]
+
+                ssm_iam_role, ssm_iam_policy = self.__create_automation_iam_cloudformation_block(rule_params['SSMAutomation'], rule_name)
+                json_body["Resources"][self.__get_alphanumeric_rule_name(rule_name+'Role')] = ssm_iam_role
+                json_body["Resources"][self.__get_alphanumeric_rule_name(rule_name+'Policy')] = ssm_iam_policy
+
+        #debugging
+        # print(json.dumps(json_body, indent=2))
+
+        #deploy config rule
+        my_cfn = my_session.client('cloudformation')
+        try:
+            my_stack_name = self.__get_stack_name_from_rule_name(rule_name)
+            my_stack = my_cfn.describe_stacks(StackName=my_stack_name)
+            #If we've gotten here, stack exists and we should update it.
+            print (f"[{self.args.region}]: Updating CloudFormation Stack for " + rule_name)
+            try:
+                cfn_args = {
+                    'StackName': my_stack_name,
+                    'TemplateBody': json.dumps(json_body,indent=2),
+                    'Parameters': my_params,
+                    'Capabilities': ['CAPABILITY_IAM', 'CAPABILITY_NAMED_IAM']
+                }
 
+                # If no tags key is specified, or if the tags dict is empty
+                if cfn_tags is not None:
+                    cfn_args['Tags'] = cfn_tags
 
-            if self.args.lambda_security_groups and self.args.lambda_subnets:
-                my_params.append({
-                    'ParameterKey': 'SecurityGroupIds',
-                    'ParameterValue': self.args.lambda_security_groups
-                })
-                my_params.append({
-                    'ParameterKey': 'SubnetIds',
-                    'ParameterValue': self.args.lambda_subnets
-                })
+                response = my_cfn.update_stack(**cfn_args)
+            except botocore.exceptions.ClientError as e:
+                if e.response['Error']['Code'] == 'ValidationError':
 
-            #create json of CFN template
-            cfn_body = os.path.join(path.dirname(__file__), 'template',  "configRule.json")
-            template_body = open(cfn_body, "r").read()
-            json_body = json.loads(template_body)
+                    if 'No updates are to be performed.' in str(e):
+                        #No changes made to Config rule definition, so CloudFormation won't do anything.
+                        print(f"[{my_session.region_name}]: No changes to Config Rule.")
+                    else:
+                        #Something unexpected has gone wrong.  Emit an error and bail.
+                        print(f'[{my_session.region_name}]: Validation Error on CFN\n')
+                        print(f'[{my_session.region_name}]: ' + json.dumps(cfn_args)+ "\n")
+                        print(f'[{my_session.region_name}]: {e}\n')
+                        deployment['Status'] = 'FAILED'
+                        return deployment
+                else:
+                    raise
+
+            #Since CFN won't detect changes to the lambda code stored in S3, the code is published once the stack update finishes.
+            deployment['CodeKey'] = s3_dst
+        except botocore.exceptions.ClientError as e:
+            #If we're in the exception, the stack does not exist and we should create it.
+            print (f"[{my_session.region_name}]: Creating CloudFormatioon Stack for " + rule_name)
+            cfn_args = {
+                'StackName': my_stack_name,
+                'TemplateBody': json.dumps(json_body,indent=2),
+                'Parameters': my_params,
+                'Capabilities': ['CAPABILITY_IAM', 'CAPABILITY_NAMED_IAM']
+            }
 
-            remediation = ""
-            if "Remediation" in rule_params:
-                remediation = self.__create_remediation_cloudformation_block(rule_params["Remediation"])
-                json_body["Resources"]["Remediation"] = remediation
+            if cfn_tags is not None:
+                cfn_args['Tags'] = cfn_tags
 
-                if "SSMAutomation" in rule_params:
-                    ##AWS needs to build the SSM before the Config Rule
-                    resource_depends_on = ['rdkConfigRule', self.__get_alphanumeric_rule_name(rule_name+"RemediationAction")]
-                    remediation["DependsOn"] = resource_depends_on
-                    #Add JSON Reference to SSM Document { "Ref" : "MyEC2Instance" }
-                    remediation['Properties']['TargetId'] = {"Ref" : self.__get_alphanumeric_rule_name(rule_name+"RemediationAction") }
+            response = my_cfn.create_stack(**cfn_args)
 
-            if "SSMAutomation" in rule_params:
-                print(f'[{my_session.region_name}]: Building SSM Automation Section')
+        #Cloudformation is not supporting tagging config rule currently.
+        if cfn_tags is not None and len(cfn_tags) > 0:
+            deployment['Tags'] = cfn_tags
 
-                ssm_automation = self.__create_automation_cloudformation_block(rule_params['SSMAutomation'], rule_name)
-                json_body["Resources"][self.__get_alphanumeric_rule_name(rule_name+"RemediationAction")] = ssm_automation
-                if "IAM" in rule_params['SSMAutomation']:
-                    print('Lets Build IAM Role and Policy')
-                    #TODO Check For IAM Settings
-                    json_body["Resources"]['Remediation']['Properties']['Parameters']['AutomationAssumeRole']['StaticValue']['Values'] = [{"Fn::GetAtt":[self.__get_alphanumeric_rule_name(rule_name+"Role"), "Arn"]}]
+        return deployment
 
-                    ssm_iam_role, ssm_iam_policy = self.__create_automation_iam_cloudformation_block(rule_params['SSMAutomation'], rule_name)
-                    json_body["Resources"][self.__get_alphanumeric_rule_name(rule_name+'Role')] = ssm_iam_role
-                    json_body["Resources"][self.__get_alphanumeric_rule_name(rule_name+'Policy')] = ssm_iam_policy
+    def __complete_rule_deployment(self, deployment, my_session, stack_status=None):
+        my_cfn = my_session.client('cloudformation')
 
-            #debugging
-            # print(json.dumps(json_body, indent=2))
+        #wait for changes to propagate, unless the caller already waited on every stack together.
+        if stack_status is None:
+            stack_status = self.__wait_for_cfn_stack(my_cfn, deployment['StackName'])
+        deployment['Status'] = stack_status
 
-            #deploy config rule
-            my_cfn = my_session.client('cloudformation')
-            try:
-                my_stack_name = self.__get_stack_name_from_rule_name(rule_name)
-                my_stack = my_cfn.describe_stacks(StackName=my_stack_name)
-                #If we've gotten here, stack exists and we should update it.
-                print (f"[{self.args.region}]: Updating CloudFormation Stack for " + rule_name)
-                try:
-                    cfn_args = {
-                        'StackName': my_stack_name,
-                        'TemplateBody': json.dumps(json_body,indent=2),
-                        'Parameters': my_params,
-                        'Capabilities': ['CAPABILITY_IAM', 'CAPABILITY_NAMED_IAM']
-                    }
+        #Publishing the code only touches the Lambda function, so there is nothing more to wait for in CloudFormation.
+        if deployment['CodeKey'] and 'FAILED' not in stack_status and 'ROLLBACK' not in stack_status:
+            my_lambda_arn = self.__get_lambda_arn_for_stack(deployment['StackName'], my_cfn)
 
-                    # If no tags key is specified, or if the tags dict is empty
-                    if cfn_tags is not None:
-                        cfn_args['Tags'] = cfn_tags
+            self.__publish_function_code(my_session, my_lambda_arn, deployment['CodeBucket'], deployment['CodeKey'])
 
-                    response = my_cfn.update_stack(**cfn_args)
-                except ClientError as e:
-                    if e.response['Error']['Code'] == 'ValidationError':
+        if deployment['Tags']:
+            self.__tag_config_rule(deployment['RuleName'], deployment['Tags'], my_session)
 
-                        if 'No updates are to be performed.' in str(e):
-                            #No changes made to Config rule definition, so CloudFormation won't do anything.
-                            print(f"[{my_session.region_name}]: No changes to Config Rule.")
-                        else:
-                            #Something unexpected has gone wrong.  Emit an error and bail.
-                            print(f'[{my_session.region_name}]: Validation Error on CFN\n')
-                            print(f'[{my_session.region_name}]: ' + json.dumps(cfn_args)+ "\n")
-                            print(f'[{my_session.region_name}]: {e}\n')
-                            return 1
-                    else:
-                        raise
+        return deployment
 
-                my_lambda_arn = self.__get_lambda_arn_for_stack(my_stack_name)
+    def __deploy_rules_in_parallel(self, rule_names, account_id, partition, code_bucket_name):
+        print(f"[{self.args.region}]: Deploying {len(rule_names)} Rules with up to {self.args.parallel} concurrent operations.")
 
-                print(f"[{my_session.region_name}]: Publishing Lambda code...")
-                my_lambda_client = my_session.client('lambda')
-                my_lambda_client.update_function_code(
-                    FunctionName=my_lambda_arn,
-                    S3Bucket=code_bucket_name,
-                    S3Key=s3_dst,
-                    Publish=True
-                )
-                print(f"[{my_session.region_name}]: Lambda code updated.")
-            except ClientError as e:
-                #If we're in the exception, the stack does not exist and we should create it.
-                print (f"[{my_session.region_name}]: Creating CloudFormatioon Stack for " + rule_name)
-                cfn_args = {
-                    'StackName': my_stack_name,
-                    'TemplateBody': json.dumps(json_body,indent=2),
-                    'Parameters': my_params,
-                    'Capabilities': ['CAPABILITY_IAM', 'CAPABILITY_NAMED_IAM']
-                }
+        #Sessions come from the shared pool, which makes them safe to use from every task.
+        def submit(rule_name):
+            return self.__submit_rule_deployment(rule_name, self.__get_boto_session(), account_id, partition, code_bucket_name)
 
-                if cfn_tags is not None:
-                    cfn_args['Tags'] = cfn_tags
+        stack_statuses = {}
+        def complete(deployment):
+            return self.__complete_rule_deployment(deployment, self.__get_boto_session(), stack_statuses[deployment['StackName']])
 
-                response = my_cfn.create_stack(**cfn_args)
+        #First package, upload and submit every stack, then wait on all of the stack operations together.
+        deployments = self.__run_rule_tasks(submit, rule_names, lambda rule_name: rule_name)
+        submitted = [deployment for deployment in deployments if deployment['Status'] != 'FAILED']
+        deployments = [deployment for deployment in deployments if deployment['Status'] == 'FAILED']
+        if submitted:
+            cfn_client = self.__get_boto_session().client('cloudformation')
+            stack_statuses.update(self.__wait_for_cfn_stacks(cfn_client, [deployment['StackName'] for deployment in submitted]))
+        deployments.extend(self.__run_rule_tasks(complete, submitted, lambda deployment: deployment['RuleName']))
 
-            #wait for changes to propagate.
-            self.__wait_for_cfn_stack(my_cfn, my_stack_name)
+        failed = False
+        print(f"[{self.args.region}]: Deploy summary:")
+        for deployment in sorted(deployments, key=lambda deployment: deployment['RuleName']):
+            print(f"[{self.args.region}]:   {deployment['RuleName']:<64} {deployment['Status']}")
+            if 'FAILED' in deployment['Status'] or 'ROLLBACK' in deployment['Status']:
+                failed = True
 
-            #Cloudformation is not supporting tagging config rule currently.
-            if cfn_tags is not None and len(cfn_tags) > 0:
-                self.__tag_config_rule(rule_name, cfn_tags, my_session)
+        print(f'[{self.args.region}]: Config deploy complete.')
 
-        print(f'[{my_session.region_name}]: Config deploy complete.')
+        return int(failed)
 
-        return 0
+    def __run_rule_tasks(self, task, items, get_rule_name):
+        results = []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.args.parallel) as executor:
+            futures = {submit_in_context(executor, task, item): item for item in items}
+            for future in concurrent.futures.as_completed(futures):
+                rule_name = get_rule_name(futures[future])
+                try:
+                    results.append(future.result())
+                except (Exception, SystemExit) as e:
+                    print(f"[{self.args.region}]: Error encountered deploying {rule_name}: {e}")
+                    results.append({'RuleName': rule_name, 'Status': 'FAILED'})
+
+        return results
 
     def deploy_organization(self):
         self.__parse_deploy_organization_args()
@@ -1721,7 +2499,7 @@ class rdk:
                             cfn_args['Tags'] = cfn_tags
 
                         response = my_cfn.update_stack(**cfn_args)
-                    except ClientError as e:
+                    except botocore.exceptions.ClientError as e:
                         if e.response['Error']['Code'] == 'ValidationError':
                             if 'No updates are to be performed.' in str(e):
                                 #No changes made to Config rule definition, so CloudFormation won't do anything.
@@ -1732,7 +2510,7 @@ class rdk:
                                 return 1
                         else:
                             raise
-                except ClientError as e:
+                except botocore.exceptions.ClientError as e:
                     #If we're in the exception, the stack does not exist and we should create it.
                     print ("Creating CloudFormation Stack for " + rule_name)
                     cfn_args = {
@@ -1836,7 +2614,7 @@ class rdk:
                     'ParameterKey': 'Timeout',
                     'ParameterValue': str(self.args.lambda_timeout)
                 }]
-            layers = self.__get_lambda_layers(session,self.args,params)
+            layers = self.__get_lambda_layers(my_session, self.args, rule_params)
 
 
             if self.args.lambda_layers:
@@ -1869,6 +2647,7 @@ class rdk:
 
             #deploy config rule
             my_cfn = my_session.client('cloudformation')
+            code_key = None
             try:
                 my_stack_name = self.__get_stack_name_from_rule_name(rule_name)
                 my_stack = my_cfn.describe_stacks(StackName=my_stack_name)
@@ -1887,7 +2666,7 @@ class rdk:
                         cfn_args['Tags'] = cfn_tags
 
                     response = my_cfn.update_stack(**cfn_args)
-                except ClientError as e:
+                except botocore.exceptions.ClientError as e:
                     if e.response['Error']['Code'] == 'ValidationError':
 
                         if 'No updates are to be performed.' in str(e):
@@ -1902,18 +2681,9 @@ class rdk:
                     else:
                         raise
 
-                my_lambda_arn = self.__get_lambda_arn_for_stack(my_stack_name)
-
-                print("Publishing Lambda code...")
-                my_lambda_client = my_session.client('lambda')
-                my_lambda_client.update_function_code(
-                    FunctionName=my_lambda_arn,
-                    S3Bucket=code_bucket_name,
-                    S3Key=s3_dst,
-                    Publish=True
-                )
-                print("Lambda code updated.")
-            except ClientError as e:
+                #Since CFN won't detect changes to the lambda code stored in S3, the code is published once the stack update finishes.
+                code_key = s3_dst
+            except botocore.exceptions.ClientError as e:
                 #If we're in the exception, the stack does not exist and we should create it.
                 print ("Creating CloudFormation Stack for " + rule_name)
                 cfn_args = {
@@ -1929,7 +2699,12 @@ class rdk:
                 response = my_cfn.create_stack(**cfn_args)
 
             #wait for changes to propagate.
-            self.__wait_for_cfn_stack(my_cfn, my_stack_name)
+            stack_status = self.__wait_for_cfn_stack(my_cfn, my_stack_name)
+
+            if code_key and 'FAILED' not in stack_status and 'ROLLBACK' not in stack_status:
+                my_lambda_arn = self.__get_lambda_arn_for_stack(my_stack_name, my_cfn)
+
+                self.__publish_function_code(my_session, my_lambda_arn, code_bucket_name, code_key)
 
             #Cloudformation is not supporting tagging config rule currently.
             if cfn_tags is not None and len(cfn_tags) > 0:
@@ -2021,7 +2796,11 @@ class rdk:
                 "lambda_timeout": str(self.args.lambda_timeout)
             }
 
-            params_file_path = os.path.join(os.getcwd(), rules_dir, rule_name, rule_name.lower() + ".tfvars.json")
+            #Each region gets its own variables file, since Layer ARNs and the like are region-specific.
+            params_file_name = rule_name.lower() + ".tfvars.json"
+            if self.args.region_file:
+                params_file_name = rule_name.lower() + "." + self.args.region + ".tfvars.json"
+            params_file_path = os.path.join(os.getcwd(), rules_dir, rule_name, params_file_name)
             parameters_file = open(params_file_path, 'w')
             json.dump(my_params, parameters_file, indent=4)
             parameters_file.close()
@@ -2040,85 +2819,186 @@ class rdk:
 
     def test_local(self):
         print ("Running local test!")
-        tests_successful = True
 
         args = self.__parse_test_args()
 
         #Construct our list of rules to test.
         rule_names = self.__get_rule_list_for_command()
 
+        test_cache = self.__read_test_local_cache()
+        test_hashes = {}
+        tasks = []
+        results = []
         for rule_name in rule_names:
             rule_params, rule_tags = self.__get_rule_parameters(rule_name)
             if rule_params['SourceRuntime'] not in ('python3.6', 'python3.6-lib', 'python3.7', 'python3.7-lib', 'python3.8', 'python3.8-lib', 'python3.9', 'python3.9-lib'):
                 print ("Skipping " + rule_name + " - Runtime not supported for local testing.")
                 continue
 
-            print("Testing "+rule_name)
-            test_dir = os.path.join(os.getcwd(), rules_dir, rule_name)
-            print("Looking for tests in " + test_dir)
+            #Tests that passed last time will pass again if neither the Rule, its tests, nor the RDK or Python version have changed.
+            test_hashes[rule_name] = self.__get_rule_test_hash(rule_name)
+            cached_test = test_cache['Rules'].get(rule_name)
+            if not args.force and not args.phase_profile and cached_test and cached_test['Hash'] == test_hashes[rule_name]:
+                print ("Skipping " + rule_name + " - No changes since the tests last passed.")
+                results.append(dict(cached_test['Result'], Cached=True))
+                continue
 
-            if args.verbose == True:
-                results = unittest.TextTestRunner(buffer=False, verbosity=2).run(self.__create_test_suite(test_dir))
-            else:
-                results = unittest.TextTestRunner(buffer=True, verbosity=2).run(self.__create_test_suite(test_dir))
+            tasks.append((rule_name, os.path.join(os.getcwd(), rules_dir, rule_name), args.verbose, args.phase_profile))
+
+        if tasks:
+            workers = min(args.workers or os.cpu_count() or 1, len(tasks))
+            print(f"Testing {len(tasks)} Rules in up to {workers} worker processes.")
+
+            #Each worker process only runs a single Rule's tests, so Rules cannot see each other's modules or mocks.
+            with multiprocessing.Pool(processes=workers, maxtasksperchild=1) as pool:
+                for result in pool.imap_unordered(run_rule_tests, tasks):
+                    print("Testing " + result['RuleName'])
+                    print(result['Output'])
+                    results.append(result)
 
-            print (results)
+            for result in results:
+                if result.get('Cached'):
+                    continue
+                if result['Failures'] or result['Errors']:
+                    test_cache['Rules'].pop(result['RuleName'], None)
+                else:
+                    test_cache['Rules'][result['RuleName']] = {'Hash': test_hashes[result['RuleName']], 'Result': {key: value for key, value in result.items() if key not in ('Output', 'Profile')}}
+            self.__write_test_local_cache(test_cache)
+
+        if not results:
+            return 0
+
+        results.sort(key=lambda result: result['RuleName'])
+        print("Test summary:")
+        for result in results:
+            status = 'FAIL' if result['Failures'] or result['Errors'] else 'PASS'
+            if result.get('Cached'):
+                status = 'CACHED'
+            print(f"  {result['RuleName']:<48} {status:<6} {result['Tests']:>4} tests {result['Failures']:>4} failures {result['Errors']:>4} errors {result['Duration']:>7.2f} s")
+        print(f"Ran {sum(result['Tests'] for result in results)} tests across {len(results)} Rules: {sum(result['Failures'] for result in results)} failures, {sum(result['Errors'] for result in results)} errors.")
+
+        if args.phase_profile:
+            for result in results:
+                print(f"Profile of {result['RuleName']}:")
+                if not result.get('Profile'):
+                    print("  No phase timings recorded.  Rules created with older versions of the RDK do not time their handler.")
+                    continue
+                print(f"  {'Phase':<32} {'Calls':>6} {'Total':>12} {'Mean':>12}")
+                for phase, phase_profile in sorted(result['Profile'].items(), key=lambda item: -item[1]['TotalMs']):
+                    print(f"  {phase:<32} {phase_profile['Calls']:>6} {phase_profile['TotalMs']:>9.3f} ms {phase_profile['TotalMs'] / phase_profile['Calls']:>9.3f} ms")
+
+        if args.junit_xml:
+            write_junit_xml(results, args.junit_xml)
+            print("JUnit XML written to " + args.junit_xml)
 
-            tests_successful = tests_successful and results.wasSuccessful()
-        return int(not tests_successful)
+        return int(any(result['Failures'] or result['Errors'] for result in results))
 
     def test_remote(self):
         print ("Running test_remote!")
         self.__parse_test_args()
 
+        if self.args.concurrency < 1:
+            print("--concurrency must be at least 1.")
+            sys.exit(1)
+
         #Construct our list of rules to test.
-        rule_names = self.__get_rule_list_for_command()
+        rule_names = self.__get_rule_list_for_command("test-remote")
 
         #Create our Lambda client.
         my_session = self.__get_boto_session()
         my_lambda_client = my_session.client('lambda')
 
+        my_parameters = {}
+        if self.args.test_parameters:
+            my_parameters = json.loads(self.args.test_parameters)
+
+        #Every test event is built from the same template, so only read it once.
+        test_event_template = json.load(open(os.path.join(path.dirname(__file__), 'template', event_template_filename), 'r'), strict=False)
+
+        results = []
+        invocations = []
         for rule_name in rule_names:
             print("Testing "+rule_name)
 
+            #Get the Lambda function associated with the Rule once, rather than once per CI.
+            try:
+                my_lambda_arn = self.__get_lambda_arn_for_stack(self.__get_stack_name_from_rule_name(rule_name))
+            except botocore.exceptions.ClientError as e:
+                print(f"[{my_session.region_name}]: Unable to find the Lambda function for {rule_name}: {e}")
+                results.append({'RuleName': rule_name, 'ResourceType': None, 'Status': 'ERROR', 'Error': str(e)})
+                continue
+
             #Get CI JSON from either the CLI or one of the stored templates.
-            my_cis = self.__get_test_CIs(rule_name)
-
-            my_parameters = {}
-            if self.args.test_parameters:
-                my_parameters = json.loads(self.args.test_parameters)
-
-            for my_ci in my_cis:
-                print ("\t\tTesting CI " + my_ci['resourceType'])
-
-                #Generate test event from templates
-                test_event = json.load(open(os.path.join(path.dirname(__file__), 'template', event_template_filename), 'r'), strict=False)
-                my_invoking_event = json.loads(test_event['invokingEvent'])
-                my_invoking_event['configurationItem'] = my_ci
-                my_invoking_event['notificationCreationTime'] = datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.000Z')
-                test_event['invokingEvent'] = json.dumps(my_invoking_event)
-                test_event['ruleParameters'] = json.dumps(my_parameters)
-
-                #Get the Lambda function associated with the Rule
-                stack_name = self.__get_stack_name_from_rule_name(rule_name)
-                my_lambda_arn = self.__get_lambda_arn_for_stack(stack_name)
-
-                #Call Lambda function with test event.
-                result = my_lambda_client.invoke(
-                    FunctionName=my_lambda_arn,
-                    InvocationType='RequestResponse',
-                    LogType='Tail',
-                    Payload=json.dumps(test_event)
-                )
+            for my_ci in self.__get_test_CIs(rule_name):
+                test_event = self.__build_test_event(test_event_template, my_ci, my_parameters)
+                invocations.append((rule_name, my_lambda_arn, my_ci['resourceType'], test_event))
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.args.concurrency) as executor:
+            futures = [submit_in_context(executor, self.__invoke_test_event, my_lambda_client, *invocation) for invocation in invocations]
+            for future in concurrent.futures.as_completed(futures):
+                results.append(future.result())
+
+        results.sort(key=lambda result: (result['RuleName'], result['ResourceType'] or ''))
+        summary = {status: len([result for result in results if result['Status'] == status]) for status in ['PASS', 'FAIL', 'ERROR']}
+
+        print(f"[{my_session.region_name}]: Test summary:")
+        for result in results:
+            print(f"[{my_session.region_name}]:   {result['RuleName']:<48} {str(result['ResourceType']):<40} {result['Status']:<6} {result.get('LatencyMs', 0):>8.0f} ms")
+        print(f"[{my_session.region_name}]: {summary['PASS']} passed, {summary['FAIL']} failed, {summary['ERROR']} errors.")
+
+        if self.args.report:
+            report_file = self.args.report
+            if self.args.region_file:
+                report_file = "{}.{}{}".format(os.path.splitext(report_file)[0], my_session.region_name, os.path.splitext(report_file)[1])
+            with open(report_file, 'w') as f:
+                json.dump({'Region': my_session.region_name, 'Summary': summary, 'Results': results}, f, indent=2)
+            print(f"[{my_session.region_name}]: Report written to {report_file}")
+
+        return int(summary['FAIL'] + summary['ERROR'] > 0)
+
+    def __build_test_event(self, test_event_template, my_ci, my_parameters):
+        #Generate test event from templates
+        test_event = copy.deepcopy(test_event_template)
+        my_invoking_event = json.loads(test_event['invokingEvent'])
+        my_invoking_event['configurationItem'] = my_ci
+        my_invoking_event['notificationCreationTime'] = datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.000Z')
+        test_event['invokingEvent'] = json.dumps(my_invoking_event)
+        test_event['ruleParameters'] = json.dumps(my_parameters)
+        return test_event
+
+    def __invoke_test_event(self, my_lambda_client, rule_name, my_lambda_arn, resource_type, test_event):
+        result = {'RuleName': rule_name, 'ResourceType': resource_type}
+        start_time = time.time()
+        try:
+            #Call Lambda function with test event.
+            response = my_lambda_client.invoke(
+                FunctionName=my_lambda_arn,
+                InvocationType='RequestResponse',
+                LogType='Tail',
+                Payload=json.dumps(test_event)
+            )
+        except botocore.exceptions.ClientError as e:
+            result.update({'Status': 'ERROR', 'LatencyMs': (time.time() - start_time) * 1000, 'Error': str(e)})
+            print(f"\t\t{rule_name} {resource_type}: {e}")
+            return result
+
+        log_text = base64.b64decode(response.get('LogResult', '')).decode('utf-8', 'replace')
+        result['LatencyMs'] = (time.time() - start_time) * 1000
+        result['Status'] = 'FAIL' if 'FunctionError' in response else 'PASS'
+        result['Payload'] = response['Payload'].read().decode('utf-8', 'replace')
+        result.update(parse_lambda_report(log_text))
+
+        #If there's an error dump execution logs to the terminal, if not print out the value returned by the lambda function.
+        print(f"\t\tTested CI {resource_type} against {rule_name}: {result['Status']}")
+        if result['Status'] == 'FAIL':
+            result['Log'] = log_text
+            print(log_text)
+        else:
+            print("\t\t\t" + result['Payload'])
+            if self.args.verbose:
+                print(log_text)
 
-                #If there's an error dump execution logs to the terminal, if not print out the value returned by the lambda function.
-                if 'FunctionError' in result:
-                    print(base64.b64decode(str(result['LogResult'])))
-                else:
-                    print("\t\t\t" + result['Payload'].read())
-                    if self.args.verbose:
-                        print(base64.b64decode(str(result['LogResult'])))
-        return 0
+        return result
 
     def status(self):
         print ("Running status!")
@@ -2130,10 +3010,194 @@ class rdk:
         my_test_ci = TestCI(self.args.ci_type)
         print(json.dumps(my_test_ci.get_json(), indent=4))
 
+    def replay(self):
+        self.args = get_replay_parser().parse_args(self.args.command_args, self.args)
+
+        rule_name = self.__clean_rule_name(self.args.rulename)
+        rule_params, rule_tags = self.__get_rule_parameters(rule_name)
+        if rule_params['SourceRuntime'] not in ('python3.6', 'python3.6-lib', 'python3.7', 'python3.7-lib', 'python3.8', 'python3.8-lib', 'python3.9', 'python3.9-lib'):
+            print ("Runtime " + rule_params['SourceRuntime'] + " is not supported for replay.")
+            return 1
+
+        rule_parameters = self.args.rule_parameters or rule_params.get('InputParameters', '{}')
+        test_event_template = json.load(open(os.path.join(path.dirname(__file__), 'template', event_template_filename), 'r'), strict=False)
+        handler_module, _, handler_name = self.__get_handler(rule_name, rule_params).rpartition('.')
+
+        #Load the Rule in-process against a stand-in boto3, so evaluations are recorded instead of sent.
+        config_client = ReplayConfigClient()
+        with rule_import_path(os.path.join(os.getcwd(), rules_dir, rule_name)):
+            sys.modules['boto3'] = ReplayBoto3(config_client)
+            handler = getattr(importlib.import_module(handler_module), handler_name)
+
+            print(f"Replaying {self.args.input} through {rule_name}.")
+            latencies = []
+            slowest = (0, None)
+            errors = 0
+            input_error = None
+            handler_output = contextlib.ExitStack()
+            if not self.args.verbose:
+                handler_output.enter_context(contextlib.redirect_stdout(open(os.devnull, 'w')))
+            with handler_output:
+                configuration_items = read_configuration_items(self.args.input)
+                while self.args.limit is None or len(latencies) < self.args.limit:
+                    try:
+                        configuration_item = next(configuration_items)
+                    except StopIteration:
+                        break
+                    except ValueError as e:
+                        input_error = e
+                        break
+                    event = self.__build_test_event(test_event_template, configuration_item, {})
+                    event['ruleParameters'] = rule_parameters
+                    event['eventLeftScope'] = configuration_item.get('configurationItemStatus') in ('ResourceDeleted', 'ResourceDeletedNotRecorded')
+
+                    start_time = time.perf_counter()
+                    try:
+                        result = handler(event, ReplayContext(self.args.lambda_timeout))
+                    except Exception as e:
+                        result = {'customerErrorCode': type(e).__name__}
+                    latency = (time.perf_counter() - start_time) * 1000
+                    latencies.append(latency)
+                    if latency > slowest[0]:
+                        slowest = (latency, configuration_item.get('resourceId'))
+
+                    #Rules built from the RDK templates return an error response rather than raising.
+                    if isinstance(result, dict) and 'customerErrorCode' in result:
+                        errors += 1
+
+        if input_error:
+            print(f"Stopped reading configuration items after {len(latencies)} items: {input_error}")
+            return 1
+
+        if not latencies:
+            print("No configuration items found in " + self.args.input)
+            return 1
+
+        total_time = sum(latencies) / 1000
+        compliance = {}
+        for evaluation in config_client.evaluations:
+            compliance[evaluation['ComplianceType']] = compliance.get(evaluation['ComplianceType'], 0) + 1
+        latencies.sort()
+        report = {
+            'RuleName': rule_name,
+            'ConfigurationItems': len(latencies),
+            'Evaluations': len(config_client.evaluations),
+            'Errors': errors,
+            'TotalSeconds': total_time,
+            'ConfigurationItemsPerSecond': len(latencies) / total_time if total_time else None,
+            'EvaluationsPerSecond': len(config_client.evaluations) / total_time if total_time else None,
+            'LatencyMs': {'p50': percentile(latencies, 50), 'p90': percentile(latencies, 90), 'p99': percentile(latencies, 99), 'max': latencies[-1]},
+            'SlowestResourceId': slowest[1],
+            'Compliance': compliance
+        }
+
+        print(f"Replayed {report['ConfigurationItems']} configuration items in {total_time:.2f} s ({report['ConfigurationItemsPerSecond'] or 0:.0f}/s).")
+        print(f"  Evaluations: {report['Evaluations']} ({report['EvaluationsPerSecond'] or 0:.0f}/s), {errors} errors")
+        print("  Latency:     " + ", ".join(f"{name} {value:.2f} ms" for name, value in report['LatencyMs'].items()))
+        print("  Compliance:  " + (", ".join(f"{name} {count}" for name, count in sorted(compliance.items())) or "none"))
+        print(f"  Slowest:     {slowest[1]}")
+        if latencies[-1] > self.args.lambda_timeout * 1000:
+            print(f"WARNING: the slowest configuration item took longer than the {self.args.lambda_timeout} s Lambda timeout.")
+
+        if self.args.report:
+            with open(self.args.report, 'w') as f:
+                json.dump(report, f, indent=2)
+            print("Report written to " + self.args.report)
+
+        return int(errors > 0)
+
+    def benchmark(self):
+        self.args = get_benchmark_parser().parse_args(self.args.command_args, self.args)
+
+        rule_name = self.__clean_rule_name(self.args.rulename)
+        rule_params, rule_tags = self.__get_rule_parameters(rule_name)
+        rule_dir = os.path.join(os.getcwd(), rules_dir, rule_name)
+        if not os.path.exists(os.path.join(rule_dir, rule_name + '_benchmark.py')):
+            print(f"No benchmark module found for {rule_name}.  Rules created with this version of the RDK include one, or copy rule_benchmark.py from the RDK runtime templates to {rule_name}_benchmark.py.")
+            return 1
+
+        #Benchmark against the example CI of every resource type the Rule is triggered by.
+        sample_cis = []
+        for resource_type in rule_params.get('SourceEvents', '').split(','):
+            if resource_type in accepted_resource_types and os.path.exists(os.path.join(path.dirname(__file__), 'template', example_ci_dir, resource_type.replace('::', '_') + '.json')):
+                sample_cis.append(TestCI(resource_type).get_json())
+
+        with rule_import_path(rule_dir):
+            benchmark_module = importlib.import_module(rule_name + '_benchmark')
+            handler = benchmark_module.RULE.lambda_handler
+            iterations = self.args.iterations or benchmark_module.ITERATIONS
+            benchmark_events = benchmark_module.build_benchmark_events(sample_cis)
+            #Benchmark modules from older versions of the RDK do not reset the Rule between evaluations.
+            reset_rule_state = getattr(benchmark_module, 'reset_rule_state', lambda: None)
+
+            print(f"Benchmarking {rule_name} with {iterations} iterations of {len(benchmark_events)} events.")
+            results = {}
+            with contextlib.redirect_stdout(open(os.devnull, 'w')):
+                for benchmark_name, event in benchmark_events.items():
+                    #The first call pays for lazy imports and client creation, so it is left out of the timings.
+                    handler(event, ReplayContext(60))
+                    timings = []
+                    for iteration in range(iterations):
+                        reset_rule_state()
+                        start_time = time.perf_counter()
+                        handler(event, ReplayContext(60))
+                        timings.append((time.perf_counter() - start_time) * 1000)
+                    timings.sort()
+                    results[benchmark_name] = {
+                        'Iterations': iterations,
+                        'MeanMs': sum(timings) / len(timings),
+                        'MedianMs': percentile(timings, 50),
+                        'P90Ms': percentile(timings, 90),
+                        'MinMs': timings[0]
+                    }
+
+        history_file = os.path.join(benchmark_history_dir, rule_name + '.json')
+        try:
+            with open(history_file, 'r') as f:
+                history = json.load(f)
+        except (IOError, ValueError):
+            history = {'Runs': []}
+        baseline = history['Runs'][-1]['Results'] if history['Runs'] else {}
+
+        regressions = 0
+        print(f"{'Benchmark':<48} {'Median':>10} {'p90':>10} {'Baseline':>10} {'Change':>8}")
+        for benchmark_name, result in results.items():
+            line = f"{benchmark_name:<48} {result['MedianMs']:>7.3f} ms {result['P90Ms']:>7.3f} ms"
+            if benchmark_name in baseline and baseline[benchmark_name]['MedianMs']:
+                change = (result['MedianMs'] / baseline[benchmark_name]['MedianMs'] - 1) * 100
+                line += f" {baseline[benchmark_name]['MedianMs']:>7.3f} ms {change:>+7.1f}%"
+                if change > self.args.threshold:
+                    line += "  REGRESSION"
+                    regressions += 1
+            print(line)
+
+        if regressions:
+            print(f"{regressions} benchmarks are more than {self.args.threshold:g}% slower than the previous run.")
+
+        if not self.args.no_history:
+            history['Runs'].append({
+                'Timestamp': datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ'),
+                'RdkVersion': MY_VERSION,
+                'PythonVersion': sys.version.split()[0],
+                'Results': results
+            })
+            del history['Runs'][:-benchmark_history_limit]
+            os.makedirs(benchmark_history_dir, exist_ok=True)
+            with open(history_file, 'w') as f:
+                json.dump(history, f, indent=2)
+
+        return int(regressions > 0)
+
     def logs(self):
         self.args = get_logs_parser().parse_args(self.args.command_args, self.args)
 
-        self.args.rulename = self.__clean_rule_name(self.args.rulename)
+        if self.args.stats:
+            return self.__logs_stats()
+
+        if len(self.args.rulename) != 1:
+            print("Specify a single Rule to display the logs of.  Run \"rdk logs -h\" for more info.")
+            return 1
+        self.args.rulename = self.__clean_rule_name(self.args.rulename[0])
 
         my_session = self.__get_boto_session()
         cw_logs = my_session.client('logs')
@@ -2559,50 +3623,16 @@ class rdk:
         print(rulename + " added to RuleSet " + ruleset)
 
     def __list_rulesets(self):
-        rulesets = []
-        rules = []
-
-        for obj_name in os.listdir('.'):
-            #print(obj_name)
-            params_file_path = os.path.join('.', obj_name, parameter_file_name)
-            if os.path.isfile(params_file_path):
-                parameters_file = open(params_file_path, 'r')
-                my_params = json.load(parameters_file)
-                parameters_file.close()
-                if 'RuleSets' in my_params['Parameters']:
-                    rulesets.extend(my_params['Parameters']['RuleSets'])
-
-                    if self.args.ruleset in my_params['Parameters']['RuleSets']:
-                        #print("Found rule! " + obj_name)
-                        rules.append(obj_name)
-
         if self.args.ruleset:
-            rules.sort()
+            rules = workspace_index.get_rules_in_rulesets([self.args.ruleset])
             print("Rules in", self.args.ruleset, ": ")
             print(*rules, sep="\n")
         else:
-            deduped = list(set(rulesets))
-            deduped.sort()
-            print("RuleSets: ", *deduped)
+            print("RuleSets: ", *workspace_index.get_rulesets())
 
     def __get_template_dir(self):
         return os.path.join(path.dirname(__file__), 'template')
 
-    def __create_test_suite(self, test_dir):
-        tests = []
-        for (top, dirs, filenames) in os.walk(test_dir):
-            for filename in fnmatch.filter(filenames, '*_test.py'):
-                print(filename)
-                sys.path.append(top)
-                tests.append(filename[:-3])
-
-        suites = [unittest.defaultTestLoader.loadTestsFromName(test) for test in tests]
-        for suite in suites:
-            print("Debug!")
-            print(suite)
-
-        return unittest.TestSuite(suites)
-
     def __clean_rule_name(self, rule_name):
         output = rule_name
         if output[-1:] == "/":
@@ -2682,10 +3712,93 @@ class rdk:
         #If more records were requested than exist, return as many as we found.
         return log_events
 
-    def __get_log_group_name(self):
-        params, cfn_tags = self.__get_rule_parameters(self.args.rulename)
+    def __get_log_group_name(self, rule_name=None):
+        rule_name = rule_name or self.args.rulename
+        params, cfn_tags = self.__get_rule_parameters(rule_name)
+
+        return '/aws/lambda/' + self.__get_lambda_name(rule_name, params)
 
-        return '/aws/lambda/' + self.__get_lambda_name(self.args.rulename, params)
+    def __logs_stats(self):
+        if self.args.rulesets:
+            self.args.rulesets = self.args.rulesets.split(',')
+        rule_names = self.__get_rule_list_for_command("logs")
+
+        my_session = self.__get_boto_session()
+        end_time = int(time.time() * 1000)
+        start_time = end_time - self.args.hours * 3600 * 1000
+
+        #Rules are independent, so scan their log groups side by side.
+        with concurrent.futures.ThreadPoolExecutor(max_workers=LOGS_STATS_MAX_WORKERS) as executor:
+            futures = [submit_in_context(executor, self.__get_lambda_stats, my_session, rule_name, start_time, end_time) for rule_name in rule_names]
+            all_stats = [future.result() for future in futures]
+
+        for stats in all_stats:
+            self.__print_lambda_stats(my_session.region_name, stats)
+        return 0
+
+    def __get_lambda_stats(self, my_session, rule_name, start_time, end_time):
+        stats = {'RuleName': rule_name, 'Reports': [], 'Timeouts': 0, 'Timeout': None, 'MemorySize': None}
+        cw_logs = my_session.client('logs')
+        paginator = cw_logs.get_paginator('filter_log_events')
+        try:
+            for page in paginator.paginate(logGroupName=self.__get_log_group_name(rule_name), startTime=start_time, endTime=end_time, filterPattern='?"REPORT RequestId" ?"Task timed out"'):
+                for event in page['events']:
+                    if 'Task timed out' in event['message']:
+                        stats['Timeouts'] += 1
+                    else:
+                        stats['Reports'].append(parse_lambda_report(event['message']))
+        except cw_logs.exceptions.ResourceNotFoundException:
+            #The function has never been invoked.
+            pass
+
+        #The REPORT lines do not include the timeout, so read the current settings from the function itself.
+        try:
+            params, cfn_tags = self.__get_rule_parameters(rule_name)
+            function_configuration = my_session.client('lambda').get_function_configuration(FunctionName=self.__get_lambda_name(rule_name, params))
+            stats['Timeout'] = function_configuration['Timeout']
+            stats['MemorySize'] = function_configuration['MemorySize']
+        except botocore.exceptions.ClientError:
+            pass
+
+        return stats
+
+    def __print_lambda_stats(self, region, stats):
+        reports = stats['Reports']
+        if not reports:
+            print(f"[{region}]: {stats['RuleName']}: no invocations in the last {self.args.hours} hours.")
+            return
+
+        def summarize(field):
+            values = sorted(report[field] for report in reports if field in report)
+            if not values:
+                return "n/a"
+            return f"p50 {percentile(values, 50):.0f}  p90 {percentile(values, 90):.0f}  p99 {percentile(values, 99):.0f}  max {values[-1]:.0f}"
+
+        cold_starts = len([report for report in reports if 'InitDurationMs' in report])
+        memory_size = stats['MemorySize'] or max(report.get('MemorySizeMB', 0) for report in reports)
+        max_memory_used = max(report.get('MaxMemoryUsedMB', 0) for report in reports)
+        max_duration = max(report.get('DurationMs', 0) + report.get('InitDurationMs', 0) for report in reports)
+
+        print(f"[{region}]: {stats['RuleName']}: {len(reports)} invocations in the last {self.args.hours} hours, {cold_starts / len(reports):.1%} cold starts, {stats['Timeouts']} timeouts.")
+        print(f"[{region}]:   Duration (ms)          {summarize('DurationMs')}")
+        print(f"[{region}]:   Billed duration (ms)   {summarize('BilledDurationMs')}")
+        print(f"[{region}]:   Init duration (ms)     {summarize('InitDurationMs')}")
+        #The memory size is unknown if the function configuration could not be read and the REPORT lines do not include it.
+        if memory_size:
+            print(f"[{region}]:   Max memory used (MB)   {summarize('MaxMemoryUsedMB')}, of {memory_size:.0f} MB ({1 - max_memory_used / memory_size:.0%} headroom)")
+        else:
+            print(f"[{region}]:   Max memory used (MB)   {summarize('MaxMemoryUsedMB')}, of unknown memory size (n/a headroom)")
+
+        #Lambda memory is set in 1 MB steps from 128 MB, but round to 64 MB to keep the suggestion stable between runs.
+        suggested_memory = int(min(10240, max(128, -(-max_memory_used * LAMBDA_MEMORY_HEADROOM // 64) * 64)))
+        suggested_timeout = int(min(900, max(3, -(-max_duration * LAMBDA_TIMEOUT_HEADROOM // 1000))))
+        if stats['Timeouts'] and stats['Timeout']:
+            suggested_timeout = max(suggested_timeout, min(900, stats['Timeout'] * 2))
+        current_timeout = f" (currently {stats['Timeout']} s)" if stats['Timeout'] else ""
+        current_memory = f" (currently {memory_size:.0f} MB)" if memory_size else ""
+        print(f"[{region}]:   Suggested settings:    memory {suggested_memory} MB{current_memory}, timeout {suggested_timeout} s{current_timeout}")
+        if memory_size and suggested_memory < memory_size:
+            print(f"[{region}]:   Note: Lambda allocates CPU in proportion to memory, so check durations after lowering it.")
 
     def __get_boto_session(self):
         session_args = {}
@@ -2693,17 +3806,24 @@ class rdk:
         if self.args.region:
             session_args['region_name'] = self.args.region
 
+        #Multi-region runs share a single credential resolution across all regions.
+        if 'shared_credentials' in self.args:
+            return get_pooled_session(session_args, limit_concurrency=True, credentials=self.args.shared_credentials)
+
         if self.args.profile:
             session_args['profile_name']=self.args.profile
         elif self.args.access_key_id and self.args.secret_access_key:
             session_args['aws_access_key_id']=self.args.access_key_id
             session_args['aws_secret_access_key']=self.args.secret_access_key
 
-        return boto3.session.Session(**session_args)
+        return get_pooled_session(session_args)
 
     def __get_caller_identity_details(self, session):
-        my_sts = session.client('sts')
-        response = my_sts.get_caller_identity()
+        if 'caller_identity' in self.args:
+            response = self.args.caller_identity
+        else:
+            my_sts = session.client('sts')
+            response = my_sts.get_caller_identity()
         arn_split = response['Arn'].split(':')
 
         return {
@@ -2725,33 +3845,9 @@ class rdk:
     def __get_rule_list_for_command(self, Command="deploy"):
         rule_names = []
         if self.args.all:
-            d = '.'
-            for obj_name in os.listdir('.'):
-                obj_path = os.path.join('.', obj_name)
-                if os.path.isdir(obj_path) and not obj_name == 'rdk':
-                    for file_name in os.listdir(obj_path):
-                        if obj_name not in rule_names:
-                            if os.path.exists(os.path.join(obj_path, 'parameters.json')):
-                                rule_names.append(obj_name)
-                            else:
-                                if file_name.split('.')[0] == obj_name:
-                                    rule_names.append(obj_name)
-                                if os.path.exists(os.path.join(obj_path, 'src', 'main', 'java', 'com', 'rdk', 'RuleCode.java')):
-                                    rule_names.append(obj_name)
-                                if os.path.exists(os.path.join(obj_path, 'RuleCode.cs')):
-                                    rule_names.append(obj_name)
+            rule_names = workspace_index.get_rule_names()
         elif self.args.rulesets:
-            for obj_name in os.listdir('.'):
-                params_file_path = os.path.join('.', obj_name, parameter_file_name)
-                if os.path.isfile(params_file_path):
-                    parameters_file = open(params_file_path, 'r')
-                    my_params = json.load(parameters_file)
-                    parameters_file.close()
-                    if 'RuleSets' in my_params['Parameters']:
-                        s_input = set(self.args.rulesets)
-                        s_params = set(my_params['Parameters']['RuleSets'])
-                        if s_input.intersection(s_params):
-                            rule_names.append(obj_name)
+            rule_names = workspace_index.get_rules_in_rulesets(self.args.rulesets)
         elif self.args.rulename:
             for rule_name in self.args.rulename:
                 cleaned_rule_name = self.__clean_rule_name(rule_name)
@@ -2774,45 +3870,21 @@ class rdk:
         return rule_names
 
     def __get_rule_parameters(self, rule_name):
-        params_file_path = os.path.join(os.getcwd(), rules_dir, rule_name, parameter_file_name)
-
         try:
-            parameters_file = open(params_file_path, 'r')
+            return rule_catalog.get_rule_parameters(rule_name)
         except IOError as e:
             print("Failed to open parameters file for rule '{}'".format(rule_name))
-            print(e.message)
+            print(e)
             sys.exit(1)
-
-        my_json = {}
-
-        try:
-            my_json = json.load(parameters_file)
         except ValueError as ve:  # includes simplejson.decoder.JSONDecodeError
             print("Failed to decode JSON in parameters file for Rule {}".format(rule_name))
-            print(ve.message)
-            parameters_file.close()
+            print(ve)
             sys.exit(1)
         except Exception as e:
             print("Error loading parameters file for Rule {}".format(rule_name))
-            print(e.message)
-            parameters_file.close()
+            print(e)
             sys.exit(1)
 
-        parameters_file.close()
-
-        my_tags = my_json.get('Tags', None)
-
-        #Needed for backwards compatibility with earlier versions of parameters file
-        if my_tags is None:
-            my_tags = "[]"
-            my_json['Parameters']['Tags'] = my_tags
-
-        #as my_tags was returned as a string in earlier versions, convert it back to a list
-        if isinstance(my_tags, str):
-            my_tags = json.loads(my_tags)
-
-        return my_json['Parameters'], my_tags
-
     def __parse_rule_args(self, is_required):
         self.args = get_rule_parser(is_required, self.args.command).parse_args(self.args.command_args, self.args)
 
@@ -2905,6 +3977,10 @@ class rdk:
         if self.args.functions_only and not self.args.stack_name:
             self.args.stack_name = "RDK-Config-Rule-Functions"
 
+        if not ForceArgument and self.args.parallel < 1:
+            print("--parallel must be at least 1.")
+            sys.exit(1)
+
         if self.args.rulesets:
             self.args.rulesets = self.args.rulesets.split(',')
 
@@ -2960,55 +4036,7 @@ class rdk:
                     sys.exit(1)
 
     def __package_function_code(self, rule_name, params):
-        if params['SourceRuntime'] == "java8":
-            # Do java build and package.
-            print("Running Gradle Build for " + rule_name)
-            working_dir = os.path.join(os.getcwd(), rules_dir, rule_name)
-            command = ["gradle", "build"]
-            subprocess.call(command, cwd=working_dir)
-
-            # set source as distribution zip
-            s3_src = os.path.join(os.getcwd(), rules_dir, rule_name, 'build', 'distributions', rule_name + ".zip")
-        elif params['SourceRuntime'] in ["dotnetcore1.0", "dotnetcore2.0"]:
-            print("Packaging " + rule_name)
-            working_dir = os.path.join(os.getcwd(), rules_dir, rule_name)
-            commands = [["dotnet", "restore"]]
-
-            app_runtime = "netcoreapp1.0"
-            if params['SourceRuntime'] == "dotnetcore2.0":
-                app_runtime = "netcoreapp2.0"
-
-            commands.append(["dotnet", "lambda", "package", "-c", "Release", "-f", app_runtime])
-
-            for command in commands:
-                subprocess.call(command, cwd=working_dir)
-
-            # Remove old zip file if it already exists
-            package_file_dst = os.path.join(rule_name, rule_name+".zip")
-            self.__delete_package_file(package_file_dst)
-
-            # Create new package in temp directory, copy to rule directory
-            # This copy avoids the archiver trying to include the output zip in itself
-            s3_src_dir = os.path.join(os.getcwd(), rules_dir, rule_name, 'bin', 'Release', app_runtime, 'publish')
-            tmp_src = shutil.make_archive(os.path.join(tempfile.gettempdir(), rule_name+session.region_name), 'zip', s3_src_dir)
-            if not(os.path.exists(package_file_dst)):
-                shutil.copy(tmp_src, package_file_dst)
-            s3_src = os.path.abspath(package_file_dst)
-            self.__delete_package_file(tmp_src)
-
-        else:
-            print("Zipping " + rule_name)
-            # Remove old zip file if it already exists
-            package_file_dst = os.path.join(rule_name, rule_name+".zip")
-            self.__delete_package_file(package_file_dst)
-
-            # zip rule code files and upload to s3 bucket
-            s3_src_dir = os.path.join(os.getcwd(), rules_dir, rule_name)
-            tmp_src = shutil.make_archive(os.path.join(tempfile.gettempdir(), rule_name+session.region_name), 'zip', s3_src_dir)
-            if not(os.path.exists(package_file_dst)):
-                shutil.copy(tmp_src, package_file_dst)
-            s3_src = os.path.abspath(package_file_dst)
-            self.__delete_package_file(tmp_src)
+        self.__get_rule_package(rule_name, params)
 
         s3_dst = "/".join((rule_name, rule_name + ".zip"))
 
@@ -3158,48 +4186,99 @@ class rdk:
         parameters_file = open(params_file_path, 'w')
         json.dump(my_params, parameters_file, indent=2)
         parameters_file.close()
+        rule_catalog.invalidate(rulename)
+        workspace_index.update_rule(rulename)
 
     def __wait_for_cfn_stack(self, cfn_client, stackname):
-        my_session = self.__get_boto_session()
-        in_progress = True
-        while in_progress:
-            my_stacks = []
-            response = cfn_client.list_stacks()
-
-            for stack in response["StackSummaries"]:
-                if stack['StackName'] == stackname:
-                    my_stacks.append(stack)
-
-            #Find the stack (if any) that hasn't already been deleted.
-            all_deleted = True
-            active_stack = None
-            for stack in my_stacks:
-                if stack['StackStatus'] != 'DELETE_COMPLETE':
-                    active_stack = stack
-                    all_deleted = False
-
-            #If all stacks have been deleted, clearly we're done!
-            if all_deleted:
-                in_progress = False
-                print(f"[{my_session.region_name}]: CloudFormation stack operation complete.")
-                continue
+        return self.__wait_for_cfn_stacks(cfn_client, [stackname])[stackname]
+
+    def __wait_for_cfn_stacks(self, cfn_client, stack_names):
+        #Track every stack individually with targeted describe calls, printing new stack events as they arrive.
+        region = cfn_client.meta.region_name
+        seen_events = self.seen_stack_events
+        for stack_name in stack_names:
+            seen_events.setdefault(stack_name, None)
+        pending = list(dict.fromkeys(stack_names))
+        results = {}
+        delay = CFN_WAIT_MIN_DELAY
+
+        while True:
+            progress = False
+            for stack_name in pending:
+                if self.__print_new_stack_events(cfn_client, stack_name, seen_events):
+                    progress = True
+
+                stack = self.__describe_stack(cfn_client, stack_name)
+                stack_status = stack['StackStatus'] if stack else 'DELETE_COMPLETE'
+                if stack_status.endswith('_IN_PROGRESS'):
+                    continue
+
+                progress = True
+                results[stack_name] = stack_status
+                if 'FAILED' in stack_status:
+                    print(f"[{region}]: CloudFormation stack operation Failed for " + stack_name +".")
+                elif 'ROLLBACK' in stack_status:
+                    print(f"[{region}]: CloudFormation stack operation Rolled Back for " + stack_name +".")
+                else:
+                    print(f"[{region}]: CloudFormation stack operation complete for " + stack_name + ".")
+                    continue
+                if 'StackStatusReason' in stack:
+                    print(f"[{region}]: Reason: " + stack['StackStatusReason'])
+
+            pending = [stack_name for stack_name in pending if stack_name not in results]
+            if not pending:
+                return results
+
+            #Poll quickly while stacks are making visible progress, and back off while they are idle.
+            if progress:
+                delay = CFN_WAIT_MIN_DELAY
             else:
-                if 'FAILED' in active_stack['StackStatus']:
-                    in_progress = False
-                    print(f"[{my_session.region_name}]: CloudFormation stack operation Failed for " + stackname +".")
-                    if 'StackStatusReason' in active_stack:
-                        print(f"[{my_session.region_name}]: Reason: " + active_stack['StackStatusReason'])
-                elif active_stack['StackStatus'] == 'ROLLBACK_COMPLETE':
-                    in_progress = False
-                    print(f"[{my_session.region_name}]: CloudFormation stack operation Rolled Back for " + stackname +".")
-                    if 'StackStatusReason' in active_stack:
-                        print(f"[{my_session.region_name}]: Reason: " + active_stack['StackStatusReason'])
-                elif 'COMPLETE' in active_stack['StackStatus']:
-                    in_progress = False
-                    print(f"[{my_session.region_name}]: CloudFormation stack operation complete.")
+                delay = min(delay * 2, CFN_WAIT_MAX_DELAY)
+                print(f"[{region}]: Waiting for {len(pending)} CloudFormation stack operation(s) to complete...")
+            time.sleep(delay)
+
+    def __describe_stack(self, cfn_client, stack_name):
+        try:
+            return cfn_client.describe_stacks(StackName=stack_name)['Stacks'][0]
+        except botocore.exceptions.ClientError as ce:
+            #Stacks that no longer exist (e.g. once a deletion finishes) are reported as a ValidationError.
+            if ce.response['Error']['Code'] == 'ValidationError' and 'does not exist' in str(ce):
+                return None
+            raise
+
+    def __print_new_stack_events(self, cfn_client, stack_name, seen_events):
+        #describe_stack_events returns the newest events first, so read until reaching an event that was already printed.
+        region = cfn_client.meta.region_name
+        new_events = []
+        try:
+            for page in cfn_client.get_paginator('describe_stack_events').paginate(StackName=stack_name):
+                for event in page['StackEvents']:
+                    if event['EventId'] == seen_events[stack_name]:
+                        break
+                    new_events.append(event)
+
+                    #On the first poll, only show the events of the operation currently in progress.
+                    if seen_events[stack_name] is None and event['LogicalResourceId'] == stack_name and event['ResourceStatus'].endswith('_IN_PROGRESS') and event['ResourceType'] == 'AWS::CloudFormation::Stack':
+                        break
                 else:
-                    print(f"[{my_session.region_name}]: Waiting for CloudFormation stack operation to complete...")
-                    time.sleep(5)
+                    continue
+                break
+        except botocore.exceptions.ClientError as ce:
+            if ce.response['Error']['Code'] == 'ValidationError':
+                return False
+            raise
+
+        if not new_events:
+            return False
+
+        seen_events[stack_name] = new_events[0]['EventId']
+        for event in reversed(new_events):
+            message = f"[{region}]: {stack_name} - {event['LogicalResourceId']} {event['ResourceStatus']}"
+            if event.get('ResourceStatusReason'):
+                message += " (" + event['ResourceStatusReason'] + ")"
+            print(message)
+
+        return True
 
     def __get_handler(self, rule_name, params):
         if 'SourceHandler' in params:
@@ -3242,14 +4321,10 @@ class rdk:
 
         return test_ci_list
 
-    def __get_lambda_arn_for_stack(self, stack_name):
-        #create custom session based on whatever credentials are available to us
-        my_session = self.__get_boto_session()
-
-        my_cfn = my_session.client('cloudformation')
-
-        #Since CFN won't detect changes to the lambda code stored in S3 as a reason to update the stack, we need to manually update the code reference in Lambda once the CFN has run.
-        self.__wait_for_cfn_stack(my_cfn, stack_name)
+    def __get_lambda_arn_for_stack(self, stack_name, my_cfn=None):
+        #Callers that just changed the stack wait for it to finish first, so this only reads its outputs.
+        if my_cfn is None:
+            my_cfn = self.__get_boto_session().client('cloudformation')
 
         # Lambda function is an output of the stack.
         my_updated_stack = my_cfn.describe_stacks(StackName=stack_name)
@@ -3260,7 +4335,7 @@ class rdk:
                 my_lambda_arn = output['OutputValue']
 
         if my_lambda_arn == 'NOTFOUND':
-            print(f"[{my_session.region_name}]: Could not read CloudFormation stack output to find Lambda function.")
+            print(f"[{my_cfn.meta.region_name}]: Could not read CloudFormation stack output to find Lambda function.")
             sys.exit(1)
 
         return my_lambda_arn
@@ -3282,29 +4357,54 @@ class rdk:
     def __get_lambda_arn_for_rule(self, rule_name, partition, region, account, params):
         return "arn:{}:lambda:{}:{}:function:{}".format(partition, region, account, self.__get_lambda_name(rule_name, params))
 
-    def __delete_package_file(self, file):
-        try:
-            os.remove(file)
-        except OSError:
-            pass
-
     def __upload_function_code(self, rule_name, params, account_id, session, code_bucket_name):
+        s3_dst = "/".join((rule_name, rule_name+".zip"))
+
+        #Skip packaging entirely if the code in S3 was built from identical sources.
+        source_hash = self.__get_rule_source_hash(rule_name, params)
+        if self.__find_uploaded_package(session, code_bucket_name, s3_dst, source_hash):
+            print (f"[{session.region_name}]: No changes to code for " + rule_name + ", skipping upload.")
+            return s3_dst
+
+        package = self.__get_rule_package(rule_name, params, source_hash)
+        self.__upload_package(session, package, code_bucket_name, s3_dst, source_hash)
+
+        return s3_dst
+
+    def __get_rule_package(self, rule_name, params, source_hash=None):
+        #Packages are cached by source hash, so a build is only ever run once for the same sources, even across regions.
+        if not source_hash:
+            source_hash = self.__get_rule_source_hash(rule_name, params)
+        rule_cache_dir = os.path.join(package_cache_dir, rule_name)
+        cached_package_file = os.path.join(rule_cache_dir, source_hash + ".zip")
+
+        if os.path.exists(cached_package_file):
+            with open(cached_package_file, 'rb') as f:
+                package = f.read()
+        else:
+            package = self.__build_rule_package(rule_name, params)
+
+            #Only the latest build of each Rule is kept.
+            os.makedirs(rule_cache_dir, exist_ok=True)
+            for file_name in os.listdir(rule_cache_dir):
+                self.__delete_package_file(os.path.join(rule_cache_dir, file_name))
+            self.__write_package_file(cached_package_file, package)
+
+        self.__write_package_file(os.path.join(rule_name, rule_name+".zip"), package)
+
+        return package
+
+    def __build_rule_package(self, rule_name, params):
         if params['SourceRuntime'] == "java8":
             #Do java build and package.
-            print (f"[{session.region_name}]: Running Gradle Build for "+rule_name)
+            print ("Running Gradle Build for "+rule_name)
             working_dir = os.path.join(os.getcwd(), rules_dir, rule_name)
             command = ["gradle","build"]
             subprocess.call( command, cwd=working_dir)
 
-            #set source as distribution zip
-            s3_src = os.path.join(os.getcwd(), rules_dir, rule_name, 'build', 'distributions', rule_name+session.region_name+".zip")
-            s3_dst = "/".join((rule_name, rule_name+".zip"))
-
-            my_s3 = session.resource('s3')
-
-            print (f"[{session.region_name}]: Uploading " + rule_name)
-            my_s3.meta.client.upload_file(s3_src, code_bucket_name, s3_dst)
-            print (f"[{session.region_name}]: Upload complete.")
+            #use the distribution zip as the package
+            with open(os.path.join(working_dir, 'build', 'distributions', rule_name+".zip"), 'rb') as f:
+                return f.read()
 
         elif params['SourceRuntime'] in ["dotnetcore1.0","dotnetcore2.0"]:
             print ("Packaging "+rule_name)
@@ -3320,48 +4420,189 @@ class rdk:
             for command in commands:
                 subprocess.call( command, cwd=working_dir)
 
-            # Remove old zip file if it already exists
-            package_file_dst = os.path.join(rule_name, rule_name+".zip")
-            self.__delete_package_file(package_file_dst)
+            return self.__build_package(os.path.join(working_dir, 'bin', 'Release', app_runtime, 'publish'), [])
+
+        print ("Zipping " + rule_name)
+        return self.__build_package(os.path.join(os.getcwd(), rules_dir, rule_name), package_exclude_patterns)
 
-            # Create new package in temp directory, copy to rule directory
-            # This copy avoids the archiver trying to include the output zip in itself
-            s3_src_dir = os.path.join(os.getcwd(),rules_dir, rule_name,'bin','Release', app_runtime, 'publish')
-            tmp_src = shutil.make_archive(os.path.join(tempfile.gettempdir(), rule_name+session.region_name), 'zip', s3_src_dir)
-            s3_dst = "/".join((rule_name, rule_name+".zip"))
+    def __delete_package_file(self, file):
+        try:
+            os.remove(file)
+        except OSError:
+            pass
 
-            my_s3 = session.resource('s3')
+    def __build_package(self, source_dir, exclude_patterns):
+        #Entries are sorted and timestamps fixed, so identical sources always produce byte-identical packages.
+        package = io.BytesIO()
+        with zipfile.ZipFile(package, 'w', zipfile.ZIP_DEFLATED) as package_zip:
+            for relative_path, file_path in self.__get_package_files(source_dir, exclude_patterns):
+                entry = zipfile.ZipInfo(relative_path, date_time=(1980, 1, 1, 0, 0, 0))
+                entry.compress_type = zipfile.ZIP_DEFLATED
+                entry.external_attr = (0o755 if os.stat(file_path).st_mode & 0o111 else 0o644) << 16
+                with open(file_path, 'rb') as f:
+                    package_zip.writestr(entry, f.read())
+
+        return package.getvalue()
+
+    def __get_package_files(self, source_dir, exclude_patterns, exclude_dirs=package_exclude_dirs):
+        package_files = []
+        for root, dirs, files in os.walk(source_dir):
+            dirs[:] = [d for d in dirs if d not in exclude_dirs]
+            for file_name in files:
+                if any(fnmatch.fnmatch(file_name, pattern) for pattern in exclude_patterns):
+                    continue
+                file_path = os.path.join(root, file_name)
+                package_files.append((os.path.relpath(file_path, source_dir).replace(os.sep, '/'), file_path))
 
-            print (f"[{session.region_name}]: Uploading " + rule_name)
-            my_s3.meta.client.upload_file(tmp_src, code_bucket_name, s3_dst)
-            print (f"[{session.region_name}]: Upload complete.")
-            if not(os.path.exists(package_file_dst)):
-                shutil.copy(tmp_src, package_file_dst)
-            self.__delete_package_file(tmp_src)
+        return sorted(package_files)
 
-        else:
-            print (f"[{session.region_name}]: Zipping " + rule_name)
-            # Remove old zip file if it already exists
-            package_file_dst = os.path.join(rule_name, rule_name+".zip")
-            self.__delete_package_file(package_file_dst)
+    def __write_package_file(self, package_file_dst, package):
+        #Write to a temporary file and rename it, so concurrent readers never see a partial package.
+        #The temporary file lives under .rdk, so that it can never be picked up as part of a Rule's sources.
+        os.makedirs(package_tmp_dir, exist_ok=True)
+        tmp_fd, tmp_package_file = tempfile.mkstemp(prefix=os.path.basename(package_file_dst) + '.', dir=package_tmp_dir)
+        try:
+            with os.fdopen(tmp_fd, 'wb') as f:
+                f.write(package)
+            os.replace(tmp_package_file, package_file_dst)
+        except BaseException:
+            self.__delete_package_file(tmp_package_file)
+            raise
+
+    def __upload_package(self, session, package, code_bucket_name, s3_dst, source_hash=None):
+        code_sha256 = base64.b64encode(hashlib.sha256(package).digest()).decode('utf-8')
+
+        #Record the hashes on the object itself so that runners without a local manifest can still detect unchanged code.
+        metadata = {'rdk-code-sha256': code_sha256}
+        if source_hash:
+            metadata['rdk-source-hash'] = source_hash
+
+        my_s3_client = session.client('s3')
+
+        print (f"[{session.region_name}]: Uploading " + s3_dst)
+        my_s3_client.upload_fileobj(io.BytesIO(package), code_bucket_name, s3_dst, ExtraArgs={'Metadata': metadata})
+        print (f"[{session.region_name}]: Upload complete.")
+
+        s3_object = my_s3_client.head_object(Bucket=code_bucket_name, Key=s3_dst)
+        self.__update_package_manifest(code_bucket_name, s3_dst, {
+            'SourceHash': source_hash,
+            'CodeSha256': code_sha256,
+            'ETag': s3_object['ETag']
+        })
+
+    def __find_uploaded_package(self, session, code_bucket_name, s3_dst, source_hash):
+        if self.args.force_upload:
+            return None
 
-            #zip rule code files and upload to s3 bucket
-            s3_src_dir = os.path.join(os.getcwd(), rules_dir, rule_name)
+        try:
+            s3_object = session.client('s3').head_object(Bucket=code_bucket_name, Key=s3_dst)
+        except botocore.exceptions.ClientError:
+            return None
 
-            tmp_src = shutil.make_archive(os.path.join(tempfile.gettempdir(), rule_name+session.region_name), 'zip', s3_src_dir)
+        #The local manifest is only trusted while the object in S3 is still the one we uploaded.
+        package = self.__read_package_manifest()['Objects'].get("/".join((code_bucket_name, s3_dst)))
+        if package and package['SourceHash'] == source_hash and package['ETag'] == s3_object['ETag']:
+            return package
+
+        metadata = s3_object.get('Metadata', {})
+        if metadata.get('rdk-source-hash') == source_hash:
+            package = {
+                'SourceHash': source_hash,
+                'CodeSha256': metadata.get('rdk-code-sha256'),
+                'ETag': s3_object['ETag']
+            }
+            self.__update_package_manifest(code_bucket_name, s3_dst, package)
+            return package
 
-            s3_dst = "/".join((rule_name, rule_name+".zip"))
+        return None
 
-            my_s3 = session.resource('s3')
+    def __publish_function_code(self, my_session, my_lambda_arn, code_bucket_name, s3_dst):
+        my_lambda_client = my_session.client('lambda')
 
-            print (f"[{session.region_name}]: Uploading " + rule_name)
-            my_s3.meta.client.upload_file(tmp_src, code_bucket_name, s3_dst)
-            print (f"[{session.region_name}]: Upload complete.")
-            if not(os.path.exists(package_file_dst)):
-                shutil.copy(tmp_src, package_file_dst)
-            self.__delete_package_file(tmp_src)
+        #Publishing identical code would only create a redundant Lambda version.
+        package = self.__read_package_manifest()['Objects'].get("/".join((code_bucket_name, s3_dst)))
+        if package and package.get('CodeSha256') and not self.args.force_upload:
+            try:
+                current_code_sha256 = my_lambda_client.get_function_configuration(FunctionName=my_lambda_arn)['CodeSha256']
+            except botocore.exceptions.ClientError:
+                current_code_sha256 = None
+
+            if current_code_sha256 == package['CodeSha256']:
+                print(f"[{my_session.region_name}]: No changes to Lambda code, skipping publish.")
+                return
+
+        print(f"[{my_session.region_name}]: Publishing Lambda code...")
+        my_lambda_client.update_function_code(
+            FunctionName=my_lambda_arn,
+            S3Bucket=code_bucket_name,
+            S3Key=s3_dst,
+            Publish=True
+        )
+        print(f"[{my_session.region_name}]: Lambda code updated.")
 
-        return s3_dst
+    def __get_rule_source_hash(self, rule_name, params):
+        #Hash the relative path and contents of every file that ends up in the Rule package, or that the Rule is built from.
+        if 'source_hashes' in self.args and rule_name in self.args.source_hashes:
+            return self.args.source_hashes[rule_name]
+
+        exclude_dirs = package_exclude_dirs
+        if params['SourceRuntime'] in ["java8", "dotnetcore1.0", "dotnetcore2.0"]:
+            exclude_dirs = package_exclude_dirs + build_output_dirs
+
+        source_dir = os.path.join(os.getcwd(), rules_dir, rule_name)
+        source_hash = hashlib.sha256()
+        for relative_path, file_path in self.__get_package_files(source_dir, package_exclude_patterns, exclude_dirs):
+            with open(file_path, 'rb') as f:
+                source_hash.update(relative_path.encode('utf-8') + b'\0' + hashlib.sha256(f.read()).digest())
+
+        return source_hash.hexdigest()
+
+    def __get_rule_test_hash(self, rule_name):
+        #Unlike the package hash, this also covers the tests themselves, and the versions that run them.
+        source_dir = os.path.join(os.getcwd(), rules_dir, rule_name)
+        test_hash = hashlib.sha256((MY_VERSION + '\0' + sys.version).encode('utf-8'))
+        for relative_path, file_path in self.__get_package_files(source_dir, rdk_output_patterns + ['*.pyc']):
+            with open(file_path, 'rb') as f:
+                test_hash.update(relative_path.encode('utf-8') + b'\0' + hashlib.sha256(f.read()).digest())
+
+        return test_hash.hexdigest()
+
+    def __read_test_local_cache(self):
+        try:
+            with open(os.path.join(rdk_dir, test_local_cache_filename), 'r') as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return {'Rules': {}}
+
+    def __write_test_local_cache(self, test_cache):
+        cache_file = os.path.join(rdk_dir, test_local_cache_filename)
+        if not os.path.exists(rdk_dir):
+            os.makedirs(rdk_dir, exist_ok=True)
+        tmp_cache_file = cache_file + "." + str(os.getpid())
+        with open(tmp_cache_file, 'w') as f:
+            json.dump(test_cache, f, indent=2, sort_keys=True)
+        os.replace(tmp_cache_file, cache_file)
+
+    def __read_package_manifest(self):
+        try:
+            with open(os.path.join(rdk_dir, package_manifest_filename), 'r') as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return {'Objects': {}}
+
+    def __update_package_manifest(self, code_bucket_name, s3_dst, package):
+        manifest_file = os.path.join(rdk_dir, package_manifest_filename)
+        with package_manifest_lock:
+            manifest = self.__read_package_manifest()
+            manifest['Objects']["/".join((code_bucket_name, s3_dst))] = package
+
+            #Write to a process-specific temporary file and rename it, so concurrent regions never see a partial manifest.
+            if not os.path.exists(rdk_dir):
+                os.makedirs(rdk_dir, exist_ok=True)
+            tmp_manifest_file = manifest_file + "." + str(os.getpid())
+            with open(tmp_manifest_file, 'w') as f:
+                json.dump(manifest, f, indent=2, sort_keys=True)
+            os.replace(tmp_manifest_file, manifest_file)
 
     def __create_remediation_cloudformation_block(self, remediation_config):
         remediation = {
@@ -3671,7 +4912,7 @@ class rdk:
             create_type = "update"
             try:
                 cfn_client.describe_stacks(StackName='serverlessrepo-rdklib')
-            except ClientError as ce:
+            except botocore.exceptions.ClientError as ce:
                 if ce.response['Error']['Code'] == "ValidationError":
                     create_type = "create"
                 else:
@@ -3684,7 +4925,7 @@ class rdk:
                 return 1
             if code == -1:
                 print(f"[{session.region_name}]: Error creating change set, attempting to use manual deployment")
-                raise ClientError()
+                raise botocore.exceptions.ClientError()
             print(f"[{session.region_name}]: Executing change set to deploy rdklib-layer")
             cfn_client.execute_change_set(ChangeSetName=change_set_arn)
             waiter = cfn_client.get_waiter(f'stack_{create_type}_complete')
@@ -3692,7 +4933,7 @@ class rdk:
             print(f"[{session.region_name}]: Successfully executed change set")
             return 1
         # 2021-10-13 -> aws partition regions where SAR is not supported throw EndpointConnectionError and aws-cn throw ClientError
-        except (EndpointConnectionError, ClientError):
+        except (botocore.exceptions.EndpointConnectionError, botocore.exceptions.ClientError):
             return None
     def __create_new_lambda_layer_locally(self, session, layer_name="rdklib-layer"):
         region = session.region_name
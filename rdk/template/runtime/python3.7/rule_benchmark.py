@@ -0,0 +1,116 @@
+import copy
+import json
+import sys
+from unittest.mock import MagicMock
+
+##############
+# Parameters #
+##############
+
+# Number of times each event is evaluated, unless overridden with "rdk benchmark --iterations"
+ITERATIONS = 100
+
+# Define the rule parameters to evaluate the events with
+RULE_PARAMETERS = '{}'
+
+#############
+# Main Code #
+#############
+
+CONFIG_CLIENT_MOCK = MagicMock()
+STS_CLIENT_MOCK = MagicMock()
+
+# Evaluations are thrown away, so that the benchmark only measures the Rule itself
+CONFIG_CLIENT_MOCK.put_evaluations = lambda **kwargs: {'FailedEvaluations': []}
+
+# Clients of any other service return MagicMocks, so that Rules calling other APIs can still be benchmarked
+OTHER_CLIENT_MOCKS = {}
+
+class Boto3Mock():
+    @staticmethod
+    def client(client_name, *args, **kwargs):
+        if client_name == 'config':
+            return CONFIG_CLIENT_MOCK
+        if client_name == 'sts':
+            return STS_CLIENT_MOCK
+        return OTHER_CLIENT_MOCKS.setdefault(client_name, MagicMock())
+
+sys.modules['boto3'] = Boto3Mock()
+
+RULE = __import__('<%RuleName%>')
+
+def build_benchmark_events(sample_cis):
+    """Return the events to benchmark, keyed by benchmark name. Add your own events here to benchmark them too.
+
+    Keyword arguments:
+    sample_cis -- the example configuration items for each resource type of the Rule, provided by "rdk benchmark"
+    """
+    events = {}
+    for configuration_item in sample_cis:
+        events[configuration_item['resourceType']] = build_lambda_configurationchange_event(configuration_item, RULE_PARAMETERS)
+    if sample_cis:
+        events['Oversized ' + sample_cis[0]['resourceType']] = build_lambda_oversized_event(sample_cis[0], RULE_PARAMETERS)
+    events['Scheduled'] = build_lambda_scheduled_event(RULE_PARAMETERS)
+    return events
+
+def reset_rule_state():
+    """Called by "rdk benchmark" before every evaluation, so that each one fetches resource configurations again rather than measuring cache hits."""
+    if hasattr(RULE, 'RESOURCE_CONFIG_CACHE'):
+        RULE.RESOURCE_CONFIG_CACHE.clear()
+
+####################
+# Helper Functions #
+####################
+
+def build_lambda_event(invoking_event, rule_parameters=None):
+    event_to_return = {
+        'configRuleName':'myrule',
+        'executionRoleArn':'roleArn',
+        'eventLeftScope': False,
+        'invokingEvent': json.dumps(invoking_event),
+        'accountId': '123456789012',
+        'configRuleArn': 'arn:aws:config:us-east-1:123456789012:config-rule/config-rule-8fngan',
+        'resultToken':'token'
+    }
+    if rule_parameters:
+        event_to_return['ruleParameters'] = rule_parameters
+    return event_to_return
+
+def build_lambda_configurationchange_event(configuration_item, rule_parameters=None):
+    invoking_event = {
+        'configurationItem': configuration_item,
+        'notificationCreationTime': '2017-12-23T22:11:18.158Z',
+        'messageType': 'ConfigurationItemChangeNotification'
+    }
+    return build_lambda_event(invoking_event, rule_parameters)
+
+def build_lambda_oversized_event(configuration_item, rule_parameters=None):
+    # The Rule fetches oversized configuration items with get_resource_config_history, which returns the configuration as a string
+    api_configuration_item = copy.deepcopy(configuration_item)
+    api_configuration_item['configuration'] = json.dumps(api_configuration_item['configuration'])
+    CONFIG_CLIENT_MOCK.get_resource_config_history.side_effect = lambda **kwargs: {'configurationItems': [copy.deepcopy(api_configuration_item)]}
+
+    invoking_event = {
+        'configurationItemSummary': {
+            'changeType': 'UPDATE',
+            'configurationItemVersion': configuration_item.get('version'),
+            'configurationItemCaptureTime': configuration_item.get('configurationItemCaptureTime'),
+            'configurationStateId': configuration_item.get('configurationStateId'),
+            'awsAccountId': configuration_item.get('accountId'),
+            'configurationItemStatus': configuration_item.get('configurationItemStatus'),
+            'resourceType': configuration_item['resourceType'],
+            'resourceId': configuration_item['resourceId'],
+            'ARN': configuration_item.get('arn'),
+            'awsRegion': configuration_item.get('awsRegion')
+        },
+        'notificationCreationTime': '2017-12-23T22:11:18.158Z',
+        'messageType': 'OversizedConfigurationItemChangeNotification'
+    }
+    return build_lambda_event(invoking_event, rule_parameters)
+
+def build_lambda_scheduled_event(rule_parameters=None):
+    invoking_event = {
+        'messageType': 'ScheduledNotification',
+        'notificationCreationTime': '2017-12-23T22:11:18.158Z'
+    }
+    return build_lambda_event(invoking_event, rule_parameters)
@@ -1,6 +1,15 @@
 import json
+import os
 import sys
+import collections
+import copy
 import datetime
+import random
+import time
+import types
+import uuid
+import zlib
+import concurrent.futures
 import boto3
 import botocore
 
@@ -19,9 +28,59 @@ DEFAULT_RESOURCE_TYPE = 'AWS::::Account'
 # Set to True to get the lambda to assume the Role attached on the Config Service (useful for cross-account).
 ASSUME_ROLE_MODE = False
 
+# To let a periodic rule that runs out of time resume in a new invocation, yield Checkpoint objects from evaluate_compliance()
+# and set where checkpoints are stored: 's3://bucket/prefix', 'dynamodb://table' or 'file:///path' (for tests).
+# The Lambda function's role needs access to the store, and lambda:InvokeFunction on the function itself (see the RDK documentation).
+CHECKPOINT_STORE = os.environ.get('RDK_CHECKPOINT_STORE')
+
+# Set the RDK_METRICS environment variable to 1 to log the time spent in each phase of lambda_handler as CloudWatch Embedded Metric Format.
+METRICS_ENABLED = os.environ.get('RDK_METRICS', '0').lower() not in ('', '0', 'false')
+METRICS_NAMESPACE = 'RDK/ConfigRules'
+
 # Other parameters (no change needed)
 CONFIG_ROLE_TIMEOUT_SECONDS = 900
 
+# Assumed-role credentials are refreshed this many seconds before they expire.
+CREDENTIALS_REFRESH_SECONDS = 300
+
+# Evaluations are sent in batches of up to 100 (the API limit), with up to this many batches in flight at once.
+PUT_EVALUATIONS_BATCH_SIZE = 100
+PUT_EVALUATIONS_CONCURRENCY = 4
+
+# Throttled batches are retried this many times, backing off up to PUT_EVALUATIONS_MAX_BACKOFF_SECONDS.
+PUT_EVALUATIONS_MAX_RETRIES = 5
+PUT_EVALUATIONS_MAX_BACKOFF_SECONDS = 5
+
+# No more batches are sent when less than this much Lambda execution time remains.
+REMAINING_TIME_BUFFER_MILLIS = 3000
+
+# At a checkpoint with less than this much Lambda execution time left, evaluation continues in a new invocation instead.
+CHECKPOINT_BUFFER_MILLIS = 60000
+
+# Stop re-invoking after this many invocations for the same scheduled evaluation.
+CHECKPOINT_MAX_INVOCATIONS = 20
+
+# Resource configurations fetched from Config are cached across warm invocations, for up to this many resources and seconds.
+RESOURCE_CONFIG_CACHE_SIZE = 1000
+RESOURCE_CONFIG_CACHE_TTL_SECONDS = 300
+
+# Uncached configurations are fetched in batches of up to 100 resources (the API limit), with up to this many batches in flight at once.
+BATCH_GET_RESOURCE_CONFIG_BATCH_SIZE = 100
+BATCH_GET_RESOURCE_CONFIG_CONCURRENCY = 4
+
+# Resources that Config did not process are retried this many times, backing off up to BATCH_GET_RESOURCE_CONFIG_MAX_BACKOFF_SECONDS.
+BATCH_GET_RESOURCE_CONFIG_MAX_RETRIES = 5
+BATCH_GET_RESOURCE_CONFIG_MAX_BACKOFF_SECONDS = 5
+
+# Assumed-role credentials and boto clients are kept across warm invocations of the Lambda function.
+ASSUMED_ROLE_CREDENTIALS = {}
+CLIENT_CACHE = {}
+RESOURCE_CONFIG_CACHE = collections.OrderedDict()
+
+# Milliseconds spent in each phase of the current invocation, and calls and milliseconds across all invocations (used by rdk test-local --phase-profile).
+PHASE_TIMINGS = {}
+PHASE_PROFILE = {}
+
 #############
 # Main Code #
 #############
@@ -34,6 +93,11 @@ def evaluate_compliance(event, configuration_item, valid_rule_parameters):
     a string -- either COMPLIANT, NON_COMPLIANT or NOT_APPLICABLE
     a dictionary -- the evaluation dictionary, usually built by build_evaluation_from_config_item()
     a list of dictionary -- a list of evaluation dictionary , usually built by build_evaluation()
+    a generator of dictionary -- evaluation dictionaries are sent in batches while they are yielded, so sending overlaps with evaluating (useful for periodic rules over many resources)
+
+    A generator can also yield Checkpoint(state) between evaluations, where state is anything JSON serializable (e.g. a pagination token) from which it can carry on.
+    If the Lambda function is about to run out of time at a checkpoint, the state is saved to CHECKPOINT_STORE and the function invokes itself to resume:
+    get_checkpoint_state(event) then returns the saved state (or None on a fresh run).
 
     Keyword arguments:
     event -- the event variable given in the lambda handler
@@ -90,14 +154,29 @@ def get_client(service, event, region=None):
     event -- the event variable given in the lambda handler
     region -- the region where the client is called (default: None)
     """
+    with timed_phase('GetClient'):
+        return get_cached_client(service, event, region)
+
+# Clients are reused across warm invocations, see CLIENT_CACHE
+def get_cached_client(service, event, region=None):
     if not ASSUME_ROLE_MODE:
-        return boto3.client(service, region)
-    credentials = get_assume_role_credentials(get_execution_role_arn(event), region)
-    return boto3.client(service, aws_access_key_id=credentials['AccessKeyId'],
-                        aws_secret_access_key=credentials['SecretAccessKey'],
-                        aws_session_token=credentials['SessionToken'],
-                        region_name=region
-                       )
+        if (service, None, region) not in CLIENT_CACHE:
+            CLIENT_CACHE[(service, None, region)] = (boto3.client(service, region), None)
+        return CLIENT_CACHE[(service, None, region)][0]
+    role_arn = get_execution_role_arn(event)
+    credentials = get_assume_role_credentials(role_arn, region)
+    cached_client = CLIENT_CACHE.get((service, role_arn, region))
+    if cached_client and cached_client[1] is credentials:
+        return cached_client[0]
+    client = boto3.client(service, aws_access_key_id=credentials['AccessKeyId'],
+                          aws_secret_access_key=credentials['SecretAccessKey'],
+                          aws_session_token=credentials['SessionToken'],
+                          region_name=region
+                         )
+    # Only reuse the client for as long as its credentials are cached
+    if credentials is ASSUMED_ROLE_CREDENTIALS.get((role_arn, region)):
+        CLIENT_CACHE[(service, role_arn, region)] = (client, credentials)
+    return client
 
 # This generate an evaluation for config
 def build_evaluation(resource_id, compliance_type, event, resource_type=DEFAULT_RESOURCE_TYPE, annotation=None):
@@ -136,6 +215,51 @@ def build_evaluation_from_config_item(configuration_item, compliance_type, annot
     eval_ci['OrderingTimestamp'] = configuration_item['configurationItemCaptureTime']
     return eval_ci
 
+# Fetch the current configuration of many resources at once, e.g. to look up the resources related to a configuration item.
+def get_resource_configurations(resource_keys):
+    """Return a dictionary mapping each (resource type, resource id) to its configuration item, or None if Config does not know the resource.
+
+    Keyword arguments:
+    resource_keys -- a list of (resource type, resource id) tuples
+    """
+    configuration_items = {}
+    missing_keys = []
+    for resource_key in set(resource_keys):
+        cached_item = get_cached_resource_configuration(resource_key + (None,))
+        if cached_item:
+            configuration_items[resource_key] = convert_api_configuration(cached_item)
+        else:
+            missing_keys.append(resource_key)
+
+    batches = [missing_keys[i:i + BATCH_GET_RESOURCE_CONFIG_BATCH_SIZE] for i in range(0, len(missing_keys), BATCH_GET_RESOURCE_CONFIG_BATCH_SIZE)]
+    with timed_phase('BatchGetResourceConfig'), concurrent.futures.ThreadPoolExecutor(max_workers=BATCH_GET_RESOURCE_CONFIG_CONCURRENCY) as executor:
+        for base_items in executor.map(batch_get_resource_config, batches):
+            for base_item in base_items:
+                resource_key = (base_item['resourceType'], base_item['resourceId'])
+                cache_resource_configuration(resource_key + (None,), base_item)
+                configuration_items[resource_key] = convert_api_configuration(base_item)
+
+    for resource_key in missing_keys:
+        configuration_items.setdefault(resource_key, None)
+    return configuration_items
+
+# Fetch the current configuration of every resource related to a configuration item.
+def get_related_resource_configurations(configuration_item):
+    resource_keys = []
+    for relationship in configuration_item.get('relationships', []):
+        if relationship.get('resourceId'):
+            resource_keys.append((relationship['resourceType'], relationship['resourceId']))
+    return get_resource_configurations(resource_keys)
+
+# Mark a point from which a generator returned by evaluate_compliance() can resume, in a new invocation if needed.
+class Checkpoint():
+    def __init__(self, state):
+        self.state = state
+
+# Return the state of the last Checkpoint yielded before the previous invocation ran out of time, or None on a fresh run.
+def get_checkpoint_state(event):
+    return event.get('rdkCheckpointState')
+
 ####################
 # Boilerplate Code #
 ####################
@@ -180,28 +304,66 @@ def is_scheduled_notification(message_type):
 # Get configurationItem using getResourceConfigHistory API
 # in case of OversizedConfigurationItemChangeNotification
 def get_configuration(resource_type, resource_id, configuration_capture_time):
-    result = AWS_CONFIG_CLIENT.get_resource_config_history(
-        resourceType=resource_type,
-        resourceId=resource_id,
-        laterTime=configuration_capture_time,
-        limit=1)
-    configuration_item = result['configurationItems'][0]
+    cache_key = (resource_type, resource_id, configuration_capture_time)
+    configuration_item = get_cached_resource_configuration(cache_key)
+    if not configuration_item:
+        with timed_phase('GetResourceConfigHistory'):
+            result = AWS_CONFIG_CLIENT.get_resource_config_history(
+                resourceType=resource_type,
+                resourceId=resource_id,
+                laterTime=configuration_capture_time,
+                limit=1)
+        configuration_item = result['configurationItems'][0]
+        cache_resource_configuration(cache_key, configuration_item)
     return convert_api_configuration(configuration_item)
 
-# Convert from the API model to the original invocation model
+# Get the current configuration of up to 100 resources, retrying any that Config did not process.
+def batch_get_resource_config(resource_keys):
+    base_items = []
+    unprocessed_keys = [{'resourceType': resource_type, 'resourceId': resource_id} for resource_type, resource_id in resource_keys]
+    for attempt in range(BATCH_GET_RESOURCE_CONFIG_MAX_RETRIES + 1):
+        if not unprocessed_keys:
+            break
+        if attempt:
+            time.sleep(random.uniform(0, min(BATCH_GET_RESOURCE_CONFIG_MAX_BACKOFF_SECONDS, 0.1 * 2 ** attempt)))
+        result = AWS_CONFIG_CLIENT.batch_get_resource_config(resourceKeys=unprocessed_keys)
+        base_items.extend(result.get('baseConfigurationItems', []))
+        unprocessed_keys = result.get('unprocessedResourceKeys', [])
+    return base_items
+
+# Resource configurations are cached in the form returned by the API, and converted each time they are used.
+def get_cached_resource_configuration(cache_key):
+    cached = RESOURCE_CONFIG_CACHE.get(cache_key)
+    if not cached:
+        return None
+    if cached[0] < time.time():
+        del RESOURCE_CONFIG_CACHE[cache_key]
+        return None
+    RESOURCE_CONFIG_CACHE.move_to_end(cache_key)
+    return cached[1]
+
+def cache_resource_configuration(cache_key, configuration_item):
+    RESOURCE_CONFIG_CACHE[cache_key] = (time.time() + RESOURCE_CONFIG_CACHE_TTL_SECONDS, configuration_item)
+    RESOURCE_CONFIG_CACHE.move_to_end(cache_key)
+    while len(RESOURCE_CONFIG_CACHE) > RESOURCE_CONFIG_CACHE_SIZE:
+        RESOURCE_CONFIG_CACHE.popitem(last=False)
+
+# Convert from the API model to the original invocation model, without changing the item passed in
 def convert_api_configuration(configuration_item):
-    for k, v in configuration_item.items():
+    converted_item = copy.deepcopy(configuration_item)
+    for k, v in converted_item.items():
         if isinstance(v, datetime.datetime):
-            configuration_item[k] = str(v)
-    configuration_item['awsAccountId'] = configuration_item['accountId']
-    configuration_item['ARN'] = configuration_item['arn']
-    configuration_item['configurationStateMd5Hash'] = configuration_item['configurationItemMD5Hash']
-    configuration_item['configurationItemVersion'] = configuration_item['version']
-    configuration_item['configuration'] = json.loads(configuration_item['configuration'])
-    if 'relationships' in configuration_item:
-        for i in range(len(configuration_item['relationships'])):
-            configuration_item['relationships'][i]['name'] = configuration_item['relationships'][i]['relationshipName']
-    return configuration_item
+            converted_item[k] = str(v)
+    converted_item['awsAccountId'] = converted_item['accountId']
+    converted_item['ARN'] = converted_item['arn']
+    # Items returned by batch_get_resource_config have no hash or relationships
+    converted_item['configurationStateMd5Hash'] = converted_item.get('configurationItemMD5Hash')
+    converted_item['configurationItemVersion'] = converted_item['version']
+    converted_item['configuration'] = json.loads(converted_item['configuration'])
+    if 'relationships' in converted_item:
+        for i in range(len(converted_item['relationships'])):
+            converted_item['relationships'][i]['name'] = converted_item['relationships'][i]['relationshipName']
+    return converted_item
 
 # Based on the type of message get the configuration item
 # either from configurationItem in the invoking event
@@ -231,14 +393,22 @@ def is_applicable(configuration_item, event):
 
 
 def get_assume_role_credentials(role_arn, region=None):
+    cached_credentials = ASSUMED_ROLE_CREDENTIALS.get((role_arn, region))
+    if cached_credentials and not is_credentials_expiring(cached_credentials):
+        return cached_credentials
     sts_client = boto3.client('sts', region)
     try:
-        assume_role_response = sts_client.assume_role(RoleArn=role_arn,
-                                                      RoleSessionName="configLambdaExecution",
-                                                      DurationSeconds=CONFIG_ROLE_TIMEOUT_SECONDS)
+        with timed_phase('AssumeRole'):
+            assume_role_response = sts_client.assume_role(RoleArn=role_arn,
+                                                          RoleSessionName="configLambdaExecution",
+                                                          DurationSeconds=CONFIG_ROLE_TIMEOUT_SECONDS)
         if 'liblogging' in sys.modules:
             liblogging.logSession(role_arn, assume_role_response)
-        return assume_role_response['Credentials']
+        credentials = assume_role_response['Credentials']
+        # Credentials without a known expiry are never reused
+        if not is_credentials_expiring(credentials):
+            ASSUMED_ROLE_CREDENTIALS[(role_arn, region)] = credentials
+        return credentials
     except botocore.exceptions.ClientError as ex:
         # Scrub error message for any internal account info leaks
         print(str(ex))
@@ -249,48 +419,68 @@ def get_assume_role_credentials(role_arn, region=None):
             ex.response['Error']['Code'] = "InternalError"
         raise ex
 
+# Check whether assumed-role credentials are about to expire, and so should not be reused.
+def is_credentials_expiring(credentials):
+    expiration = credentials.get('Expiration')
+    if not isinstance(expiration, datetime.datetime):
+        return True
+    refresh_time = datetime.datetime.now(expiration.tzinfo) + datetime.timedelta(seconds=CREDENTIALS_REFRESH_SECONDS)
+    return expiration <= refresh_time
+
 # This removes older evaluation (usually useful for periodic rule not reporting on AWS::::Account).
 def clean_up_old_evaluations(latest_evaluations, event):
 
-    cleaned_evaluations = []
+    latest_resources = set()
+    for latest_eval in latest_evaluations:
+        latest_resources.add((latest_eval['ComplianceResourceType'], latest_eval['ComplianceResourceId']))
 
-    old_eval = AWS_CONFIG_CLIENT.get_compliance_details_by_config_rule(
-        ConfigRuleName=event['configRuleName'],
-        ComplianceTypes=['COMPLIANT', 'NON_COMPLIANT'],
-        Limit=100)
+    cleaned_evaluations = list(get_stale_evaluations(latest_resources, event))
 
-    old_eval_list = []
+    return cleaned_evaluations + latest_evaluations
 
+# Yield a NOT_APPLICABLE evaluation for every previously evaluated resource that is not in latest_resources.
+def get_stale_evaluations(latest_resources, event):
+    for old_result in get_old_evaluation_results(event):
+        old_qualifier = old_result['EvaluationResultIdentifier']['EvaluationResultQualifier']
+        old_resource = (old_qualifier['ResourceType'], old_qualifier['ResourceId'])
+        if old_resource not in latest_resources:
+            # Also marks the resource as seen, so it is only reported once
+            latest_resources.add(old_resource)
+            yield build_evaluation(old_qualifier['ResourceId'], "NOT_APPLICABLE", event, resource_type=old_qualifier['ResourceType'])
+
+# Yield the previous COMPLIANT and NON_COMPLIANT results of the rule, one page at a time.
+def get_old_evaluation_results(event):
+    request = {
+        'ConfigRuleName': event['configRuleName'],
+        'ComplianceTypes': ['COMPLIANT', 'NON_COMPLIANT'],
+        'Limit': 100
+    }
     while True:
+        old_eval = AWS_CONFIG_CLIENT.get_compliance_details_by_config_rule(**request)
         for old_result in old_eval['EvaluationResults']:
-            old_eval_list.append(old_result)
-        if 'NextToken' in old_eval:
-            next_token = old_eval['NextToken']
-            old_eval = AWS_CONFIG_CLIENT.get_compliance_details_by_config_rule(
-                ConfigRuleName=event['configRuleName'],
-                ComplianceTypes=['COMPLIANT', 'NON_COMPLIANT'],
-                Limit=100,
-                NextToken=next_token)
-        else:
+            yield old_result
+        if 'NextToken' not in old_eval:
             break
-
-    for old_eval in old_eval_list:
-        old_resource_id = old_eval['EvaluationResultIdentifier']['EvaluationResultQualifier']['ResourceId']
-        newer_founded = False
-        for latest_eval in latest_evaluations:
-            if old_resource_id == latest_eval['ComplianceResourceId']:
-                newer_founded = True
-        if not newer_founded:
-            cleaned_evaluations.append(build_evaluation(old_resource_id, "NOT_APPLICABLE", event))
-
-    return cleaned_evaluations + latest_evaluations
+        request['NextToken'] = old_eval['NextToken']
 
 def lambda_handler(event, context):
+    if not METRICS_ENABLED:
+        return handle_event(event, context)
+    PHASE_TIMINGS.clear()
+    try:
+        with timed_phase('Total'):
+            return handle_event(event, context)
+    finally:
+        emit_phase_metrics(event)
+
+def handle_event(event, context):
     if 'liblogging' in sys.modules:
         liblogging.logEvent(event)
 
     global AWS_CONFIG_CLIENT
 
+    checkpoint = None
+
     #print(event)
     check_defined(event, 'event')
     invoking_event = json.loads(event['invokingEvent'])
@@ -305,14 +495,27 @@ def lambda_handler(event, context):
 
     try:
         AWS_CONFIG_CLIENT = get_client('config', event)
+        checkpoint = load_checkpoint(event)
         if invoking_event['messageType'] in ['ConfigurationItemChangeNotification', 'ScheduledNotification', 'OversizedConfigurationItemChangeNotification']:
             configuration_item = get_configuration_item(invoking_event)
             if is_applicable(configuration_item, event):
-                compliance_result = evaluate_compliance(event, configuration_item, valid_rule_parameters)
+                with timed_phase('EvaluateCompliance'):
+                    compliance_result = evaluate_compliance(event, configuration_item, valid_rule_parameters)
             else:
                 compliance_result = "NOT_APPLICABLE"
         else:
             return build_internal_error_response('Unexpected message type', str(invoking_event))
+
+        # A generator only runs while its evaluations are sent, so the errors it raises are handled here too
+        if isinstance(compliance_result, types.GeneratorType):
+            try:
+                return handle_evaluation_stream(compliance_result, event, context, checkpoint)
+            except botocore.exceptions.ClientError as ex:
+                # A continuation sends its evaluations with the result token of the original invocation, which Config may no longer accept
+                if checkpoint and ex.response['Error']['Code'] == 'InvalidResultTokenException':
+                    print("The result token of the original invocation has expired, giving up on this evaluation.")
+                    get_checkpoint_store().delete(event['rdkCheckpointId'])
+                raise ex
     except botocore.exceptions.ClientError as ex:
         if is_internal_error(ex):
             return build_internal_error_response("Unexpected error while completing API request", str(ex))
@@ -320,12 +523,20 @@ def lambda_handler(event, context):
     except ValueError as ex:
         return build_internal_error_response(str(ex), str(ex))
 
+    # Put together the request that reports the evaluation status
+    result_token = event['resultToken']
+    test_mode = False
+    if result_token == 'TESTMODE':
+        # Used solely for RDK test to skip actual put_evaluation API call
+        test_mode = True
+
     evaluations = []
     latest_evaluations = []
 
     if not compliance_result:
         latest_evaluations.append(build_evaluation(event['accountId'], "NOT_APPLICABLE", event, resource_type='AWS::::Account'))
-        evaluations = clean_up_old_evaluations(latest_evaluations, event)
+        with timed_phase('CleanUpOldEvaluations'):
+            evaluations = clean_up_old_evaluations(latest_evaluations, event)
     elif isinstance(compliance_result, str):
         if configuration_item:
             evaluations.append(build_evaluation_from_config_item(configuration_item, compliance_result))
@@ -333,43 +544,298 @@ def lambda_handler(event, context):
             evaluations.append(build_evaluation(event['accountId'], compliance_result, event, resource_type=DEFAULT_RESOURCE_TYPE))
     elif isinstance(compliance_result, list):
         for evaluation in compliance_result:
-            missing_fields = False
-            for field in ('ComplianceResourceType', 'ComplianceResourceId', 'ComplianceType', 'OrderingTimestamp'):
-                if field not in evaluation:
-                    print("Missing " + field + " from custom evaluation.")
-                    missing_fields = True
-
-            if not missing_fields:
+            if is_valid_evaluation(evaluation):
                 latest_evaluations.append(evaluation)
-        evaluations = clean_up_old_evaluations(latest_evaluations, event)
+        with timed_phase('CleanUpOldEvaluations'):
+            evaluations = clean_up_old_evaluations(latest_evaluations, event)
     elif isinstance(compliance_result, dict):
-        missing_fields = False
-        for field in ('ComplianceResourceType', 'ComplianceResourceId', 'ComplianceType', 'OrderingTimestamp'):
-            if field not in compliance_result:
-                print("Missing " + field + " from custom evaluation.")
-                missing_fields = True
-        if not missing_fields:
+        if is_valid_evaluation(compliance_result):
             evaluations.append(compliance_result)
     else:
         evaluations.append(build_evaluation_from_config_item(configuration_item, 'NOT_APPLICABLE'))
 
-    # Put together the request that reports the evaluation status
-    result_token = event['resultToken']
-    test_mode = False
-    if result_token == 'TESTMODE':
-        # Used solely for RDK test to skip actual put_evaluation API call
-        test_mode = True
-
     # Invoke the Config API to report the result of the evaluation
-    evaluation_copy = []
-    evaluation_copy = evaluations[:]
-    while evaluation_copy:
-        AWS_CONFIG_CLIENT.put_evaluations(Evaluations=evaluation_copy[:100], ResultToken=result_token, TestMode=test_mode)
-        del evaluation_copy[:100]
+    with timed_phase('PutEvaluations'):
+        submit_evaluations(evaluations, result_token, test_mode, context)
 
     # Used solely for RDK test to be able to test Lambda function
     return evaluations
 
+# Send the evaluations to Config in concurrent batches, stopping before the Lambda function runs out of time.
+def submit_evaluations(evaluations, result_token, test_mode, context):
+    batches = (evaluations[i:i + PUT_EVALUATIONS_BATCH_SIZE] for i in range(0, len(evaluations), PUT_EVALUATIONS_BATCH_SIZE))
+    if len(evaluations) <= PUT_EVALUATIONS_BATCH_SIZE:
+        for batch in batches:
+            put_evaluations_batch(batch, result_token, test_mode, context)
+        return
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=PUT_EVALUATIONS_CONCURRENCY) as executor:
+        futures = [executor.submit(put_evaluations_batch, batch, result_token, test_mode, context) for batch in batches]
+        for future in futures:
+            future.result()
+
+def put_evaluations_batch(batch, result_token, test_mode, context):
+    for attempt in range(PUT_EVALUATIONS_MAX_RETRIES + 1):
+        # Fail the invocation rather than silently dropping evaluations, so that Config reports the rule as failing
+        if get_remaining_time_in_millis(context) < REMAINING_TIME_BUFFER_MILLIS:
+            raise TimeoutError("Not enough time left to send " + str(len(batch)) + " evaluations.")
+        try:
+            return AWS_CONFIG_CLIENT.put_evaluations(Evaluations=batch, ResultToken=result_token, TestMode=test_mode)
+        except botocore.exceptions.ClientError as ex:
+            if ex.response['Error']['Code'] not in ['ThrottlingException', 'TooManyRequestsException'] or attempt == PUT_EVALUATIONS_MAX_RETRIES:
+                raise ex
+            # Full jitter, so that concurrent batches do not retry in lockstep
+            backoff = random.uniform(0, min(PUT_EVALUATIONS_MAX_BACKOFF_SECONDS, 0.1 * 2 ** attempt))
+            time.sleep(min(backoff, max(0, get_remaining_time_in_millis(context) - REMAINING_TIME_BUFFER_MILLIS) / 1000))
+
+# Send the evaluations yielded by a generator from evaluate_compliance(), then the NOT_APPLICABLE evaluations of resources it no longer reports.
+def handle_evaluation_stream(evaluations, event, context, checkpoint):
+    result_token = event['resultToken']
+    test_mode = result_token == 'TESTMODE'
+    sent_evaluations = []
+
+    # Resources reported by earlier invocations still count when looking for stale results
+    latest_resources = set(tuple(resource) for resource in checkpoint['Resources']) if checkpoint else set()
+
+    # Evaluating the resources and sending their evaluations are interleaved, so they are timed together
+    with timed_phase('StreamEvaluations'):
+        resume_checkpoint = stream_evaluations(evaluations, latest_resources, result_token, test_mode, context, sent_evaluations)
+    if resume_checkpoint:
+        save_checkpoint_and_continue(event, context, checkpoint, resume_checkpoint, latest_resources)
+        return sent_evaluations
+
+    # Like an empty list, an empty generator reports a "shadow" evaluation on the account
+    if not latest_resources:
+        account_evaluation = build_evaluation(event['accountId'], "NOT_APPLICABLE", event, resource_type='AWS::::Account')
+        stream_evaluations([account_evaluation], latest_resources, result_token, test_mode, context, sent_evaluations)
+
+    # Only a complete set of evaluations tells which old results are stale
+    with timed_phase('CleanUpOldEvaluations'):
+        stream_evaluations(get_stale_evaluations(set(latest_resources), event), set(), result_token, test_mode, context, sent_evaluations)
+    if checkpoint:
+        get_checkpoint_store().delete(event['rdkCheckpointId'])
+
+    # Used solely for RDK test to be able to test Lambda function
+    return sent_evaluations
+
+# Send evaluations from a generator in batches as they are yielded.
+# The (resource type, resource id) of every resource evaluated is added to latest_resources, and every evaluation sent to sent_evaluations.
+# Return the Checkpoint to resume from if the Lambda function stopped at one to continue in a new invocation, or None once every evaluation was sent.
+def stream_evaluations(evaluations, latest_resources, result_token, test_mode, context, sent_evaluations):
+    resume_checkpoint = None
+    last_checkpoint = None
+    batch = []
+    batch_start = 0
+    pending = set()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=PUT_EVALUATIONS_CONCURRENCY) as executor:
+        for evaluation in evaluations:
+            if isinstance(evaluation, Checkpoint):
+                if CHECKPOINT_STORE and get_remaining_time_in_millis(context) < CHECKPOINT_BUFFER_MILLIS:
+                    resume_checkpoint = evaluation
+                    break
+                last_checkpoint = evaluation
+                batch_start = len(batch)
+                continue
+            if not is_valid_evaluation(evaluation):
+                continue
+            latest_resources.add((evaluation['ComplianceResourceType'], evaluation['ComplianceResourceId']))
+            batch.append(evaluation)
+            if len(batch) < PUT_EVALUATIONS_BATCH_SIZE:
+                continue
+
+            if get_remaining_time_in_millis(context) < REMAINING_TIME_BUFFER_MILLIS:
+                # Resume from the last checkpoint if there is one, re-evaluating the resources after it; otherwise fail rather than lose evaluations
+                if not (CHECKPOINT_STORE and last_checkpoint):
+                    raise TimeoutError("Not enough time left to evaluate every resource, stopped after " + str(len(latest_resources)) + " evaluations.")
+                resume_checkpoint = last_checkpoint
+                del batch[batch_start:]
+                break
+            pending.add(executor.submit(put_evaluations_batch, batch, result_token, test_mode, context))
+            sent_evaluations.extend(batch)
+            batch = []
+            batch_start = 0
+
+            # Wait for a batch to be sent before evaluating more resources, so that memory use stays flat
+            if len(pending) >= PUT_EVALUATIONS_CONCURRENCY:
+                done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+
+        # Evaluations up to a checkpoint must all be sent before it is saved
+        if batch:
+            pending.add(executor.submit(put_evaluations_batch, batch, result_token, test_mode, context))
+            sent_evaluations.extend(batch)
+        for future in pending:
+            future.result()
+    return resume_checkpoint
+
+# Load the checkpoint of the invocation that re-invoked this one, and make its state available to get_checkpoint_state().
+def load_checkpoint(event):
+    if 'rdkCheckpointId' not in event:
+        return None
+    checkpoint = get_checkpoint_store().load(event['rdkCheckpointId'])
+    if checkpoint:
+        event['rdkCheckpointState'] = checkpoint['State']
+    return checkpoint
+
+# Save where evaluation stopped, and invoke the Lambda function again asynchronously to carry on from there.
+def save_checkpoint_and_continue(event, context, checkpoint, resume_checkpoint, latest_resources):
+    invocations = checkpoint['Invocations'] + 1 if checkpoint else 1
+    if invocations >= CHECKPOINT_MAX_INVOCATIONS:
+        # Start over at the next scheduled run, rather than resuming from a stale checkpoint
+        if checkpoint:
+            get_checkpoint_store().delete(event['rdkCheckpointId'])
+        raise TimeoutError("Evaluation did not finish within " + str(CHECKPOINT_MAX_INVOCATIONS) + " invocations, giving up.")
+
+    checkpoint_id = event.get('rdkCheckpointId') or str(uuid.uuid4())
+    get_checkpoint_store().save(checkpoint_id, {
+        'State': resume_checkpoint.state,
+        'Resources': sorted(latest_resources),
+        'Invocations': invocations
+    })
+    continuation_event = dict(event, rdkCheckpointId=checkpoint_id)
+    continuation_event.pop('rdkCheckpointState', None)
+    # The function invokes itself with its own role, not the Config role it may assume
+    boto3.client('lambda').invoke(FunctionName=context.invoked_function_arn, InvocationType='Event', Payload=json.dumps(continuation_event))
+    print("Evaluated " + str(len(latest_resources)) + " resources so far, continuing in a new invocation.")
+
+def get_checkpoint_store():
+    scheme, _, location = CHECKPOINT_STORE.partition('://')
+    return CHECKPOINT_STORE_TYPES[scheme](location)
+
+# Checkpoints are stored as compressed JSON, as the resources reported so far can be many.
+class LocalFileCheckpointStore():
+    def __init__(self, location):
+        self.directory = location
+
+    def load(self, checkpoint_id):
+        try:
+            with open(os.path.join(self.directory, checkpoint_id), 'rb') as checkpoint_file:
+                return json.loads(zlib.decompress(checkpoint_file.read()))
+        except FileNotFoundError:
+            return None
+
+    def save(self, checkpoint_id, checkpoint):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, checkpoint_id), 'wb') as checkpoint_file:
+            checkpoint_file.write(zlib.compress(json.dumps(checkpoint).encode('utf-8')))
+
+    def delete(self, checkpoint_id):
+        try:
+            os.remove(os.path.join(self.directory, checkpoint_id))
+        except FileNotFoundError:
+            pass
+
+class S3CheckpointStore():
+    def __init__(self, location):
+        self.bucket, _, self.prefix = location.partition('/')
+        self.client = boto3.client('s3')
+
+    def load(self, checkpoint_id):
+        try:
+            checkpoint_object = self.client.get_object(Bucket=self.bucket, Key=self.prefix + checkpoint_id)
+        except botocore.exceptions.ClientError as ex:
+            if ex.response['Error']['Code'] == 'NoSuchKey':
+                return None
+            raise ex
+        return json.loads(zlib.decompress(checkpoint_object['Body'].read()))
+
+    def save(self, checkpoint_id, checkpoint):
+        self.client.put_object(Bucket=self.bucket, Key=self.prefix + checkpoint_id, Body=zlib.compress(json.dumps(checkpoint).encode('utf-8')))
+
+    def delete(self, checkpoint_id):
+        self.client.delete_object(Bucket=self.bucket, Key=self.prefix + checkpoint_id)
+
+# Items are limited to 400 KB, so use S3 for rules that report on very many resources.
+class DynamoDBCheckpointStore():
+    def __init__(self, location):
+        self.table_name = location
+        self.client = boto3.client('dynamodb')
+
+    def load(self, checkpoint_id):
+        item = self.client.get_item(TableName=self.table_name, Key={'CheckpointId': {'S': checkpoint_id}}, ConsistentRead=True).get('Item')
+        if not item:
+            return None
+        return json.loads(zlib.decompress(item['Checkpoint']['B']))
+
+    def save(self, checkpoint_id, checkpoint):
+        self.client.put_item(TableName=self.table_name, Item={
+            'CheckpointId': {'S': checkpoint_id},
+            'Checkpoint': {'B': zlib.compress(json.dumps(checkpoint).encode('utf-8'))},
+            # Lets a TTL on the table clean up checkpoints of evaluations that never finished
+            'ExpiresAt': {'N': str(int(time.time()) + 86400)}
+        })
+
+    def delete(self, checkpoint_id):
+        self.client.delete_item(TableName=self.table_name, Key={'CheckpointId': {'S': checkpoint_id}})
+
+CHECKPOINT_STORE_TYPES = {
+    'file': LocalFileCheckpointStore,
+    's3': S3CheckpointStore,
+    'dynamodb': DynamoDBCheckpointStore
+}
+
+def is_valid_evaluation(evaluation):
+    missing_fields = False
+    for field in ('ComplianceResourceType', 'ComplianceResourceId', 'ComplianceType', 'OrderingTimestamp'):
+        if field not in evaluation:
+            print("Missing " + field + " from custom evaluation.")
+            missing_fields = True
+    return not missing_fields
+
+# Time a phase of lambda_handler. When metrics are disabled, this is a shared context manager that does nothing.
+def timed_phase(phase):
+    if METRICS_ENABLED:
+        return PhaseTimer(phase)
+    return NO_PHASE_TIMER
+
+class PhaseTimer():
+    def __init__(self, phase):
+        self.phase = phase
+
+    def __enter__(self):
+        self.start_time = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        PHASE_TIMINGS[self.phase] = PHASE_TIMINGS.get(self.phase, 0) + (time.perf_counter() - self.start_time) * 1000
+
+class NoPhaseTimer():
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+NO_PHASE_TIMER = NoPhaseTimer()
+
+# Log the phase timings of the invocation as one CloudWatch Embedded Metric Format line, which CloudWatch turns into metrics.
+def emit_phase_metrics(event):
+    metrics = {}
+    for phase, elapsed in PHASE_TIMINGS.items():
+        phase_profile = PHASE_PROFILE.setdefault(phase, {'Calls': 0, 'TotalMs': 0})
+        phase_profile['Calls'] += 1
+        phase_profile['TotalMs'] += elapsed
+        metrics[phase + 'Time'] = round(elapsed, 3)
+    emf_record = {
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': METRICS_NAMESPACE,
+                'Dimensions': [['RuleName']],
+                'Metrics': [{'Name': name, 'Unit': 'Milliseconds'} for name in metrics]
+            }]
+        },
+        'RuleName': event.get('configRuleName', '')
+    }
+    emf_record.update(metrics)
+    print(json.dumps(emf_record))
+
+# The Lambda context is not always available (e.g. in unit tests), in which case there is no time limit.
+def get_remaining_time_in_millis(context):
+    if hasattr(context, 'get_remaining_time_in_millis'):
+        return context.get_remaining_time_in_millis()
+    return float('inf')
+
 def is_internal_error(exception):
     return ((not isinstance(exception, botocore.exceptions.ClientError)) or exception.response['Error']['Code'].startswith('5')
             or 'InternalError' in exception.response['Error']['Code'] or 'ServiceError' in exception.response['Error']['Code'])
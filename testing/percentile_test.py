@@ -0,0 +1,28 @@
+# Check the nearest-rank percentiles reported by rdk replay, rdk benchmark and rdk logs --stats against known inputs.
+import sys
+
+from rdk.rdk import percentile
+
+cases = [
+    (list(range(1, 3)), 50, 1),
+    (list(range(1, 3)), 100, 2),
+    (list(range(1, 11)), 50, 5),
+    (list(range(1, 11)), 90, 9),
+    (list(range(1, 11)), 0, 1),
+    (list(range(1, 101)), 50, 50),
+    (list(range(1, 101)), 95, 95),
+    (list(range(1, 101)), 99, 99),
+    (list(range(1, 101)), 100, 100),
+    ([7], 99, 7),
+    ([], 50, None),
+]
+
+failed = False
+for values, percent, expected in cases:
+    actual = percentile(values, percent)
+    if actual != expected:
+        print(f"p{percent} of {len(values)} values: expected {expected}, got {actual}")
+        failed = True
+
+if failed:
+    sys.exit(1)
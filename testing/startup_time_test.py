@@ -0,0 +1,44 @@
+# Make sure local-only commands never import the AWS SDK or other heavy modules at startup.
+# Startup times are printed for reference only, since wall-clock limits are unreliable on shared CI runners.
+import subprocess
+import sys
+import tempfile
+
+RUNS_PER_COMMAND = 3
+
+commands = [
+    ['rulesets', 'list'],
+    ['sample-ci', 'AWS::EC2::Instance'],
+]
+
+timing_code = """
+import sys
+import time
+start = time.time()
+sys.argv = ['rdk'] + sys.argv[1:]
+from rdk import cli
+try:
+    cli.main()
+except SystemExit:
+    pass
+heavy_modules = [name for name in ('boto3', 'botocore', 'yaml', 'unittest') if name in sys.modules]
+print(f"{time.time() - start} {','.join(heavy_modules)}")
+"""
+
+failed = False
+working_dir = tempfile.mkdtemp()
+for command in commands:
+    timings = []
+    for run in range(RUNS_PER_COMMAND):
+        output = subprocess.run([sys.executable, '-c', timing_code] + command, cwd=working_dir, capture_output=True, text=True, check=True).stdout
+        elapsed, _, heavy_modules = output.strip().splitlines()[-1].partition(' ')
+        timings.append(float(elapsed))
+
+    best = min(timings)
+    print(f"rdk {' '.join(command)}: {best * 1000:.0f} ms")
+    if heavy_modules:
+        print(f"  imported {heavy_modules} at startup")
+        failed = True
+
+if failed:
+    sys.exit(1)
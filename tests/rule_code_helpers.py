@@ -0,0 +1,49 @@
+import importlib.util
+import os
+import sys
+from unittest.mock import MagicMock
+
+import botocore.exceptions
+
+RUNTIME_TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'rdk', 'template', 'runtime')
+PYTHON_RUNTIMES = ['python3.6', 'python3.7', 'python3.8', 'python3.9']
+
+
+def load_rule_code(runtime='python3.9'):
+    """Import a fresh copy of a runtime template's rule_code.py, with boto3 replaced by a MagicMock."""
+    real_boto3 = sys.modules.get('boto3')
+    sys.modules['boto3'] = MagicMock()
+    try:
+        spec = importlib.util.spec_from_file_location('rule_code_' + runtime.replace('.', '_'), os.path.join(RUNTIME_TEMPLATE_DIR, runtime, 'rule_code.py'))
+        rule_code = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(rule_code)
+    finally:
+        if real_boto3:
+            sys.modules['boto3'] = real_boto3
+        else:
+            del sys.modules['boto3']
+    rule_code.AWS_CONFIG_CLIENT = MagicMock()
+    rule_code.AWS_CONFIG_CLIENT.put_evaluations.return_value = {'FailedEvaluations': []}
+    return rule_code
+
+
+def build_client_error(code):
+    return botocore.exceptions.ClientError({'Error': {'Code': code, 'Message': code}}, 'operation')
+
+
+def build_evaluation(resource_id, compliance_type='COMPLIANT', resource_type='AWS::EC2::Instance'):
+    return {
+        'ComplianceResourceType': resource_type,
+        'ComplianceResourceId': resource_id,
+        'ComplianceType': compliance_type,
+        'OrderingTimestamp': '2020-01-01T00:00:00.000Z'
+    }
+
+
+class LambdaContext():
+    def __init__(self, remaining_time_in_millis=900000):
+        self.remaining_time_in_millis = remaining_time_in_millis
+        self.invoked_function_arn = 'arn:aws:lambda:us-east-1:123456789012:function:RDK-Rule-Function-MyRule'
+
+    def get_remaining_time_in_millis(self):
+        return self.remaining_time_in_millis
@@ -0,0 +1,187 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+from rule_code_helpers import LambdaContext, build_client_error, build_evaluation, load_rule_code
+
+
+def build_scheduled_event():
+    return {
+        'configRuleName': 'MyRule',
+        'executionRoleArn': 'arn:aws:iam::123456789012:role/config-role',
+        'eventLeftScope': False,
+        'invokingEvent': json.dumps({'messageType': 'ScheduledNotification', 'notificationCreationTime': '2020-01-01T00:00:00.000Z'}),
+        'accountId': '123456789012',
+        'configRuleArn': 'arn:aws:config:us-east-1:123456789012:config-rule/config-rule-abcdef',
+        'resultToken': 'token'
+    }
+
+
+class CheckpointTest(unittest.TestCase):
+    def setUp(self):
+        self.checkpoint_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.checkpoint_dir)
+        self.rule_code = load_rule_code()
+        self.rule_code.CHECKPOINT_STORE = 'file://' + self.checkpoint_dir
+        self.rule_code.get_client = MagicMock(return_value=self.rule_code.AWS_CONFIG_CLIENT)
+        self.put_evaluations = self.rule_code.AWS_CONFIG_CLIENT.put_evaluations
+        self.old_results = []
+        self.rule_code.AWS_CONFIG_CLIENT.get_compliance_details_by_config_rule.side_effect = lambda **kwargs: {'EvaluationResults': list(self.old_results)}
+        self.lambda_client = self.rule_code.boto3.client.return_value
+        self.context = LambdaContext()
+        self.low_time_at = None
+        self.rule_code.evaluate_compliance = self.evaluate_compliance
+
+    def evaluate_compliance(self, event, configuration_item, valid_rule_parameters):
+        # Yields a checkpoint before every 10th resource, and runs low on time from resource low_time_at onwards
+        for i in range(self.rule_code.get_checkpoint_state(event) or 0, 30):
+            if i == self.low_time_at:
+                self.context.remaining_time_in_millis = self.rule_code.CHECKPOINT_BUFFER_MILLIS - 1
+            if i and i % 10 == 0:
+                yield self.rule_code.Checkpoint(i)
+            yield build_evaluation('i-' + str(i))
+
+    def sent_resource_ids(self):
+        return [evaluation['ComplianceResourceId'] for call in self.put_evaluations.call_args_list for evaluation in call.kwargs['Evaluations']]
+
+    def saved_checkpoint(self, checkpoint_id):
+        return self.rule_code.LocalFileCheckpointStore(self.checkpoint_dir).load(checkpoint_id)
+
+    def continuation_event(self):
+        return json.loads(self.lambda_client.invoke.call_args.kwargs['Payload'])
+
+    def test_checkpoint_is_saved_and_function_reinvoked(self):
+        self.low_time_at = 15
+        self.rule_code.lambda_handler(build_scheduled_event(), self.context)
+
+        self.assertEqual(sorted(self.sent_resource_ids()), sorted('i-' + str(i) for i in range(20)))
+        invoke = self.lambda_client.invoke.call_args.kwargs
+        self.assertEqual(invoke['FunctionName'], self.context.invoked_function_arn)
+        self.assertEqual(invoke['InvocationType'], 'Event')
+        continuation_event = self.continuation_event()
+        self.assertEqual(continuation_event['resultToken'], 'token')
+        checkpoint = self.saved_checkpoint(continuation_event['rdkCheckpointId'])
+        self.assertEqual(checkpoint['State'], 20)
+        self.assertEqual(checkpoint['Invocations'], 1)
+        self.assertEqual(len(checkpoint['Resources']), 20)
+        # Stale results are only known once every resource was evaluated
+        self.rule_code.AWS_CONFIG_CLIENT.get_compliance_details_by_config_rule.assert_not_called()
+
+    def test_continuation_resumes_and_cleans_up(self):
+        self.low_time_at = 15
+        self.rule_code.lambda_handler(build_scheduled_event(), self.context)
+        continuation_event = self.continuation_event()
+        self.put_evaluations.reset_mock()
+
+        self.old_results = [
+            {'EvaluationResultIdentifier': {'EvaluationResultQualifier': {'ResourceType': 'AWS::EC2::Instance', 'ResourceId': resource_id}}, 'ComplianceType': 'NON_COMPLIANT'}
+            for resource_id in ['i-5', 'i-99']
+        ]
+        self.low_time_at = None
+        self.context = LambdaContext()
+        result = self.rule_code.lambda_handler(continuation_event, self.context)
+
+        # Resources evaluated by the first invocation are not reported as stale
+        self.assertEqual(sorted((evaluation['ComplianceResourceId'], evaluation['ComplianceType']) for evaluation in result), sorted([('i-' + str(i), 'COMPLIANT') for i in range(20, 30)] + [('i-99', 'NOT_APPLICABLE')]))
+        self.assertIsNone(self.saved_checkpoint(continuation_event['rdkCheckpointId']))
+        self.assertEqual(self.lambda_client.invoke.call_count, 1)
+
+    def test_gives_up_after_max_invocations(self):
+        event = dict(build_scheduled_event(), rdkCheckpointId='checkpoint-1')
+        self.rule_code.LocalFileCheckpointStore(self.checkpoint_dir).save('checkpoint-1', {'State': 10, 'Resources': [], 'Invocations': self.rule_code.CHECKPOINT_MAX_INVOCATIONS - 1})
+        self.low_time_at = 15
+
+        with self.assertRaises(TimeoutError):
+            self.rule_code.lambda_handler(event, self.context)
+        self.assertIsNone(self.saved_checkpoint('checkpoint-1'))
+        self.lambda_client.invoke.assert_not_called()
+
+    def test_expired_result_token_deletes_checkpoint(self):
+        event = dict(build_scheduled_event(), rdkCheckpointId='checkpoint-1')
+        self.rule_code.LocalFileCheckpointStore(self.checkpoint_dir).save('checkpoint-1', {'State': 20, 'Resources': [], 'Invocations': 1})
+        self.put_evaluations.side_effect = build_client_error('InvalidResultTokenException')
+
+        result = self.rule_code.lambda_handler(event, self.context)
+        self.assertEqual(result['customerErrorCode'], 'InvalidResultTokenException')
+        self.assertIsNone(self.saved_checkpoint('checkpoint-1'))
+
+    def test_running_out_of_time_resumes_from_last_checkpoint(self):
+        def evaluate_compliance(event, configuration_item, valid_rule_parameters):
+            for i in range(self.rule_code.get_checkpoint_state(event) or 0, 300):
+                if i == 50:
+                    yield self.rule_code.Checkpoint(i)
+                if i == 120:
+                    self.context.remaining_time_in_millis = self.rule_code.REMAINING_TIME_BUFFER_MILLIS - 1
+                yield build_evaluation('i-' + str(i))
+        self.rule_code.evaluate_compliance = evaluate_compliance
+
+        self.rule_code.lambda_handler(build_scheduled_event(), self.context)
+        self.assertEqual(sorted(self.sent_resource_ids()), sorted('i-' + str(i) for i in range(100)))
+        self.assertEqual(self.saved_checkpoint(self.continuation_event()['rdkCheckpointId'])['State'], 50)
+
+    def test_without_checkpoint_store_checkpoints_are_ignored(self):
+        self.rule_code.CHECKPOINT_STORE = None
+        self.low_time_at = 15
+        result = self.rule_code.lambda_handler(build_scheduled_event(), self.context)
+        self.assertEqual(len(result), 30)
+        self.lambda_client.invoke.assert_not_called()
+        self.assertEqual(os.listdir(self.checkpoint_dir), [])
+
+
+class CheckpointStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.rule_code = load_rule_code()
+        self.clients = {'s3': MagicMock(), 'dynamodb': MagicMock()}
+        self.rule_code.boto3.client.side_effect = lambda service_name: self.clients[service_name]
+
+    def assert_round_trip(self, store):
+        checkpoint = {'State': {'NextToken': 'abc'}, 'Resources': [['AWS::EC2::Instance', 'i-1']], 'Invocations': 2}
+        self.assertIsNone(store.load('checkpoint-1'))
+        store.save('checkpoint-1', checkpoint)
+        self.assertEqual(store.load('checkpoint-1'), checkpoint)
+        store.delete('checkpoint-1')
+        self.assertIsNone(store.load('checkpoint-1'))
+
+    def test_file_store(self):
+        checkpoint_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, checkpoint_dir)
+        self.rule_code.CHECKPOINT_STORE = 'file://' + os.path.join(checkpoint_dir, 'checkpoints')
+        self.assert_round_trip(self.rule_code.get_checkpoint_store())
+
+    def test_s3_store(self):
+        objects = {}
+        s3_client = self.clients['s3']
+        def get_object(Bucket, Key):
+            if (Bucket, Key) not in objects:
+                raise build_client_error('NoSuchKey')
+            body = MagicMock()
+            body.read.return_value = objects[(Bucket, Key)]
+            return {'Body': body}
+        s3_client.get_object.side_effect = get_object
+        s3_client.put_object.side_effect = lambda Bucket, Key, Body: objects.__setitem__((Bucket, Key), Body)
+        s3_client.delete_object.side_effect = lambda Bucket, Key: objects.pop((Bucket, Key), None)
+
+        self.rule_code.CHECKPOINT_STORE = 's3://my-bucket/rdk/checkpoints/'
+        self.assert_round_trip(self.rule_code.get_checkpoint_store())
+        self.assertEqual(s3_client.put_object.call_args.kwargs['Key'], 'rdk/checkpoints/checkpoint-1')
+
+    def test_dynamodb_store(self):
+        items = {}
+        dynamodb_client = self.clients['dynamodb']
+        def get_item(TableName, Key, ConsistentRead):
+            item = items.get((TableName, Key['CheckpointId']['S']))
+            return {'Item': item} if item else {}
+        dynamodb_client.get_item.side_effect = get_item
+        dynamodb_client.put_item.side_effect = lambda TableName, Item: items.__setitem__((TableName, Item['CheckpointId']['S']), Item)
+        dynamodb_client.delete_item.side_effect = lambda TableName, Key: items.pop((TableName, Key['CheckpointId']['S']), None)
+
+        self.rule_code.CHECKPOINT_STORE = 'dynamodb://checkpoints'
+        self.assert_round_trip(self.rule_code.get_checkpoint_store())
+        self.assertIn('ExpiresAt', dynamodb_client.put_item.call_args.kwargs['Item'])
+
+
+if __name__ == '__main__':
+    unittest.main()
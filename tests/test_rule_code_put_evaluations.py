@@ -0,0 +1,71 @@
+import filecmp
+import os
+import unittest
+from unittest.mock import patch
+
+from rule_code_helpers import PYTHON_RUNTIMES, RUNTIME_TEMPLATE_DIR, LambdaContext, build_client_error, build_evaluation, load_rule_code
+
+
+class RuntimeTemplatesTest(unittest.TestCase):
+    def test_python_runtimes_share_rule_code(self):
+        for runtime in PYTHON_RUNTIMES:
+            with self.subTest(runtime=runtime):
+                self.assertTrue(filecmp.cmp(os.path.join(RUNTIME_TEMPLATE_DIR, runtime, 'rule_code.py'), os.path.join(RUNTIME_TEMPLATE_DIR, 'python3.9', 'rule_code.py'), shallow=False))
+
+
+class SubmitEvaluationsTest(unittest.TestCase):
+    def setUp(self):
+        self.rule_code = load_rule_code()
+        self.put_evaluations = self.rule_code.AWS_CONFIG_CLIENT.put_evaluations
+        sleep_patcher = patch.object(self.rule_code.time, 'sleep')
+        self.sleep = sleep_patcher.start()
+        self.addCleanup(sleep_patcher.stop)
+
+    def sent_batches(self):
+        return [call.kwargs['Evaluations'] for call in self.put_evaluations.call_args_list]
+
+    def test_evaluations_are_split_into_batches(self):
+        evaluations = [build_evaluation('i-' + str(i)) for i in range(250)]
+        self.rule_code.submit_evaluations(evaluations, 'token', False, LambdaContext())
+
+        batches = self.sent_batches()
+        self.assertEqual(sorted(len(batch) for batch in batches), [50, 100, 100])
+        self.assertEqual(sorted(evaluation['ComplianceResourceId'] for batch in batches for evaluation in batch), sorted(evaluation['ComplianceResourceId'] for evaluation in evaluations))
+        for call in self.put_evaluations.call_args_list:
+            self.assertEqual(call.kwargs['ResultToken'], 'token')
+            self.assertFalse(call.kwargs['TestMode'])
+
+    def test_single_batch_is_sent_directly(self):
+        self.rule_code.submit_evaluations([build_evaluation('i-1')], 'TESTMODE', True, LambdaContext())
+        self.assertEqual(len(self.sent_batches()), 1)
+
+    def test_no_evaluations_sends_nothing(self):
+        self.rule_code.submit_evaluations([], 'token', False, LambdaContext())
+        self.put_evaluations.assert_not_called()
+
+    def test_throttled_batch_is_retried(self):
+        self.put_evaluations.side_effect = [build_client_error('ThrottlingException'), build_client_error('TooManyRequestsException'), {'FailedEvaluations': []}]
+        self.rule_code.put_evaluations_batch([build_evaluation('i-1')], 'token', False, LambdaContext())
+        self.assertEqual(self.put_evaluations.call_count, 3)
+        self.assertEqual(self.sleep.call_count, 2)
+
+    def test_retries_are_limited(self):
+        self.put_evaluations.side_effect = build_client_error('ThrottlingException')
+        with self.assertRaises(self.rule_code.botocore.exceptions.ClientError):
+            self.rule_code.put_evaluations_batch([build_evaluation('i-1')], 'token', False, LambdaContext())
+        self.assertEqual(self.put_evaluations.call_count, self.rule_code.PUT_EVALUATIONS_MAX_RETRIES + 1)
+
+    def test_other_errors_are_not_retried(self):
+        self.put_evaluations.side_effect = build_client_error('InvalidResultTokenException')
+        with self.assertRaises(self.rule_code.botocore.exceptions.ClientError):
+            self.rule_code.put_evaluations_batch([build_evaluation('i-1')], 'token', False, LambdaContext())
+        self.assertEqual(self.put_evaluations.call_count, 1)
+
+    def test_running_out_of_time_fails_instead_of_dropping_evaluations(self):
+        with self.assertRaises(TimeoutError):
+            self.rule_code.submit_evaluations([build_evaluation('i-' + str(i)) for i in range(150)], 'token', False, LambdaContext(remaining_time_in_millis=1000))
+        self.put_evaluations.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import json
+import unittest
+from unittest.mock import MagicMock
+
+from rule_code_helpers import LambdaContext, build_evaluation, load_rule_code
+
+
+def build_scheduled_event():
+    return {
+        'configRuleName': 'MyRule',
+        'executionRoleArn': 'arn:aws:iam::123456789012:role/config-role',
+        'eventLeftScope': False,
+        'invokingEvent': json.dumps({'messageType': 'ScheduledNotification', 'notificationCreationTime': '2020-01-01T00:00:00.000Z'}),
+        'accountId': '123456789012',
+        'configRuleArn': 'arn:aws:config:us-east-1:123456789012:config-rule/config-rule-abcdef',
+        'resultToken': 'token'
+    }
+
+
+class StreamEvaluationsTest(unittest.TestCase):
+    def setUp(self):
+        self.rule_code = load_rule_code()
+        self.rule_code.get_client = MagicMock(return_value=self.rule_code.AWS_CONFIG_CLIENT)
+        self.put_evaluations = self.rule_code.AWS_CONFIG_CLIENT.put_evaluations
+        self.old_results = []
+        self.rule_code.AWS_CONFIG_CLIENT.get_compliance_details_by_config_rule.side_effect = lambda **kwargs: {'EvaluationResults': list(self.old_results)}
+
+    def run_handler(self, evaluations, context=None):
+        self.rule_code.evaluate_compliance = lambda event, configuration_item, valid_rule_parameters: (evaluation for evaluation in evaluations())
+        return self.rule_code.lambda_handler(build_scheduled_event(), context or LambdaContext())
+
+    def sent_evaluations(self):
+        return [evaluation for call in self.put_evaluations.call_args_list for evaluation in call.kwargs['Evaluations']]
+
+    def add_old_result(self, resource_id):
+        self.old_results.append({
+            'EvaluationResultIdentifier': {'EvaluationResultQualifier': {'ResourceType': 'AWS::EC2::Instance', 'ResourceId': resource_id}},
+            'ComplianceType': 'NON_COMPLIANT'
+        })
+
+    def test_generator_returns_the_evaluations_sent(self):
+        evaluations = [build_evaluation('i-' + str(i)) for i in range(250)]
+        result = self.run_handler(lambda: iter(evaluations))
+
+        self.assertIsInstance(result, list)
+        self.assertEqual(sorted(evaluation['ComplianceResourceId'] for evaluation in result), sorted(evaluation['ComplianceResourceId'] for evaluation in evaluations))
+        self.assertEqual(sorted(evaluation['ComplianceResourceId'] for evaluation in self.sent_evaluations()), sorted(evaluation['ComplianceResourceId'] for evaluation in evaluations))
+        self.assertTrue(all(len(call.kwargs['Evaluations']) <= 100 for call in self.put_evaluations.call_args_list))
+
+    def test_generator_matches_list_results(self):
+        evaluations = [build_evaluation('i-1'), build_evaluation('i-2', 'NON_COMPLIANT')]
+        self.add_old_result('i-3')
+        streamed = self.run_handler(lambda: iter(evaluations))
+
+        self.rule_code.evaluate_compliance = lambda event, configuration_item, valid_rule_parameters: list(evaluations)
+        listed = self.rule_code.lambda_handler(build_scheduled_event(), LambdaContext())
+
+        def key(evaluation):
+            return (evaluation['ComplianceResourceId'], evaluation['ComplianceType'])
+        self.assertEqual(sorted(map(key, streamed)), sorted(map(key, listed)))
+        self.assertIn(('i-3', 'NOT_APPLICABLE'), [key(evaluation) for evaluation in streamed])
+
+    def test_empty_generator_reports_the_account(self):
+        result = self.run_handler(lambda: iter([]))
+
+        self.assertEqual(len(result), 1)
+        self.assertEqual(result[0]['ComplianceResourceType'], 'AWS::::Account')
+        self.assertEqual(result[0]['ComplianceResourceId'], '123456789012')
+        self.assertEqual(result[0]['ComplianceType'], 'NOT_APPLICABLE')
+        self.assertEqual(self.sent_evaluations(), result)
+
+    def test_empty_generator_marks_old_results_not_applicable(self):
+        self.add_old_result('i-1')
+        result = self.run_handler(lambda: iter([]))
+        self.assertEqual(sorted((evaluation['ComplianceResourceId'], evaluation['ComplianceType']) for evaluation in result), [('123456789012', 'NOT_APPLICABLE'), ('i-1', 'NOT_APPLICABLE')])
+
+    def test_invalid_evaluations_are_skipped(self):
+        result = self.run_handler(lambda: iter([build_evaluation('i-1'), {'ComplianceType': 'COMPLIANT'}]))
+        self.assertEqual([evaluation['ComplianceResourceId'] for evaluation in result], ['i-1'])
+
+    def test_value_error_while_consuming_generator_is_reported(self):
+        def evaluations():
+            yield build_evaluation('i-1')
+            raise ValueError('bad resource')
+
+        result = self.run_handler(evaluations)
+        self.assertEqual(result['internalErrorMessage'], 'bad resource')
+
+    def test_client_error_while_consuming_generator_is_reported(self):
+        def evaluations():
+            yield build_evaluation('i-1')
+            raise self.rule_code.botocore.exceptions.ClientError({'Error': {'Code': 'AccessDenied', 'Message': 'denied'}}, 'DescribeInstances')
+
+        result = self.run_handler(evaluations)
+        self.assertEqual(result['customerErrorCode'], 'AccessDenied')
+
+    def test_running_out_of_time_without_checkpoint_fails(self):
+        context = LambdaContext()
+        def evaluations():
+            for i in range(150):
+                if i == 99:
+                    context.remaining_time_in_millis = 1000
+                yield build_evaluation('i-' + str(i))
+
+        with self.assertRaises(TimeoutError):
+            self.run_handler(evaluations, context)
+        self.put_evaluations.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
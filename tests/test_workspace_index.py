@@ -0,0 +1,84 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from rdk import rdk
+
+
+class WorkspaceIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.old_cwd = os.getcwd()
+        self.workspace = tempfile.mkdtemp()
+        os.chdir(self.workspace)
+
+    def tearDown(self):
+        os.chdir(self.old_cwd)
+        shutil.rmtree(self.workspace)
+
+    def write_rule(self, rule_name, rulesets):
+        os.makedirs(rule_name, exist_ok=True)
+        params_file = os.path.join(rule_name, 'parameters.json')
+        with open(params_file, 'w') as f:
+            json.dump({'Version': '1.0', 'Parameters': {'RuleName': rule_name, 'RuleSets': rulesets}, 'Tags': '[]'}, f)
+        #Make sure the change is visible even on filesystems with coarse timestamps.
+        mtime_ns = os.stat(params_file).st_mtime_ns + 1000000000
+        os.utime(params_file, ns=(mtime_ns, mtime_ns))
+
+    def test_index_is_persisted_and_reused(self):
+        self.write_rule('RuleA', ['set1'])
+        self.write_rule('RuleB', ['set1', 'set2'])
+        self.assertEqual(rdk.WorkspaceIndex().get_rule_names(), ['RuleA', 'RuleB'])
+        self.assertTrue(os.path.exists(os.path.join('.rdk', 'workspace-index.json')))
+
+        #A fresh index loads the persisted entries instead of rescanning the unchanged Rule directories.
+        with patch.object(rdk.WorkspaceIndex, '_WorkspaceIndex__index_rule') as index_rule:
+            index = rdk.WorkspaceIndex()
+            self.assertEqual(index.get_rules_in_rulesets(['set2']), ['RuleB'])
+            self.assertEqual(index.get_rulesets(), ['set1', 'set2'])
+            index_rule.assert_not_called()
+
+    def test_changed_parameters_update_rulesets(self):
+        self.write_rule('RuleA', ['set1'])
+        self.assertEqual(rdk.WorkspaceIndex().get_rules_in_rulesets(['set1']), ['RuleA'])
+
+        self.write_rule('RuleA', ['set2'])
+        index = rdk.WorkspaceIndex()
+        self.assertEqual(index.get_rules_in_rulesets(['set1']), [])
+        self.assertEqual(index.get_rules_in_rulesets(['set2']), ['RuleA'])
+        self.assertEqual(index.get_rulesets(), ['set2'])
+
+    def test_added_and_removed_rules(self):
+        self.write_rule('RuleA', ['set1'])
+        index = rdk.WorkspaceIndex()
+        self.assertEqual(index.get_rule_names(), ['RuleA'])
+
+        self.write_rule('RuleB', ['set1'])
+        self.assertEqual(index.get_rule_names(), ['RuleA', 'RuleB'])
+
+        shutil.rmtree('RuleA')
+        self.assertEqual(index.get_rule_names(), ['RuleB'])
+        self.assertEqual(rdk.WorkspaceIndex().get_rules_in_rulesets(['set1']), ['RuleB'])
+
+    def test_java_rule_code_added_in_subdirectory(self):
+        os.makedirs(os.path.join('JavaRule', 'src', 'main', 'java', 'com', 'rdk'))
+        index = rdk.WorkspaceIndex()
+        self.assertEqual(index.get_rule_names(), [])
+
+        #Only a deep subdirectory changes, so the mtime of JavaRule itself stays the same.
+        open(os.path.join('JavaRule', 'src', 'main', 'java', 'com', 'rdk', 'RuleCode.java'), 'w').close()
+        self.assertEqual(index.get_rule_names(), ['JavaRule'])
+        self.assertEqual(rdk.WorkspaceIndex().get_rule_names(), ['JavaRule'])
+
+    def test_unreadable_index_is_rebuilt(self):
+        self.write_rule('RuleA', ['set1'])
+        os.makedirs('.rdk')
+        with open(os.path.join('.rdk', 'workspace-index.json'), 'w') as f:
+            f.write('not json')
+        self.assertEqual(rdk.WorkspaceIndex().get_rules_in_rulesets(['set1']), ['RuleA'])
+
+
+if __name__ == '__main__':
+    unittest.main()